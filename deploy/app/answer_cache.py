@@ -0,0 +1,149 @@
+# deploy/app/answer_cache.py
+
+# === Imports ===
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# === Key Utilities ===
+
+def make_cache_key(context, question, model_id):
+    """
+    Hash a (context, question) pair together with the model that answers it.
+    Outer whitespace is ignored in the context and all whitespace runs are collapsed in
+    the question; the context is otherwise kept as-is because answers are sliced from it.
+    """
+    normalized_question = " ".join(question.split())
+    payload = "\x1f".join([model_id, context.strip(), normalized_question])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# === Cache Backends ===
+
+class SqliteCacheBackend:
+    """
+    Shared answer store in a local SQLite file so several workers can reuse each other's hits.
+    """
+
+    def __init__(self, path, ttl_seconds=None, prune_every=1000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.prune_every = prune_every
+        self._puts = 0
+        self._execute("PRAGMA journal_mode=WAL")
+        self._execute("CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, value TEXT, created REAL)")
+
+    def _execute(self, sql, params=()):
+        # A short-lived connection per call keeps the backend safe across threads and processes
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                return conn.execute(sql, params).fetchone()
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """
+        Return the stored answer for a key, or None if missing or expired.
+        """
+        row = self._execute("SELECT value, created FROM answers WHERE key = ?", (key,))
+        if row is None:
+            return None
+        value, created = row
+        if self.ttl_seconds is not None and time.time() - created > self.ttl_seconds:
+            return None
+        return value
+
+    def put(self, key, value):
+        """
+        Store an answer, replacing any previous value for the key. Expired rows are
+        pruned every `prune_every` writes.
+        """
+        self._execute("INSERT OR REPLACE INTO answers VALUES (?, ?, ?)", (key, value, time.time()))
+        self._puts += 1
+        if self._puts % self.prune_every == 0:
+            self.prune()
+
+    def prune(self):
+        """
+        Delete expired answers.
+        """
+        if self.ttl_seconds is not None:
+            self._execute("DELETE FROM answers WHERE created < ?", (time.time() - self.ttl_seconds,))
+
+# === In-Process Cache ===
+
+class AnswerCache:
+    """
+    Thread-safe LRU cache of answers with an optional TTL and an optional shared backend.
+
+    Lookups check the in-process LRU first, then the backend; backend hits are promoted
+    into the LRU. Counters for hits, misses, evictions and expirations are kept for the
+    stats endpoint.
+    """
+
+    def __init__(self, max_entries=4096, ttl_seconds=None, backend=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "backend_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key):
+        """
+        Return the cached answer for a key, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, created = entry
+                if self.ttl_seconds is not None and time.monotonic() - created > self.ttl_seconds:
+                    del self._entries[key]
+                    self._counters["expirations"] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return value
+
+        value = self.backend.get(key) if self.backend is not None else None
+        with self._lock:
+            if value is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["backend_hits"] += 1
+            self._store(key, value)
+        return value
+
+    def put(self, key, value):
+        """
+        Cache an answer locally and in the shared backend.
+        """
+        with self._lock:
+            self._store(key, value)
+        if self.backend is not None:
+            self.backend.put(key, value)
+
+    def _store(self, key, value):
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def stats(self):
+        """
+        Snapshot of the cache counters and configuration.
+        """
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["backend_hits"] + self._counters["misses"]
+            hit_rate = (lookups - self._counters["misses"]) / lookups if lookups else 0.0
+            return {
+                **self._counters,
+                "hit_rate": round(hit_rate, 4),
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "backend": type(self.backend).__name__ if self.backend is not None else None,
+            }
@@ -0,0 +1,122 @@
+# deploy/app/batching.py
+
+# === Imports ===
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# === Micro-Batching Scheduler ===
+
+class MicroBatcher:
+    """
+    Gather concurrent requests into batches and run each batch through one call of `batch_fn`.
+
+    Requests are collected until `max_batch_size` items are queued or `max_wait_ms` has
+    passed since the first one arrived. `batch_fn` receives the list of queued items and
+    must return one result per item, in the same order; an exception instance in place of
+    a result is raised to that caller only. It runs on a single worker thread,
+    so forward passes never overlap and the event loop stays free to accept requests.
+    Other inference (bulk endpoints) goes through `run`, on the same thread.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=16, max_wait_ms=5.0):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self._queue = None
+        self._worker = None
+        self._executor = None
+
+    async def start(self):
+        """
+        Start the background task that drains the request queue.
+        """
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="qa-batcher")
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the background task and fail any requests still waiting in the queue.
+        """
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Batcher stopped before the request was served"))
+        self._executor.shutdown(wait=False)
+        self._executor = None
+        self._worker = None
+
+    async def submit(self, item):
+        """
+        Queue one item and wait for its result.
+        """
+        if self._worker is None:
+            raise RuntimeError("Batcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def run(self, fn, *args):
+        """
+        Run `fn(*args)` on the batcher's inference thread, between batches, and return its
+        result. Bulk requests use this so their forward passes never overlap the batcher's.
+        """
+        if self._executor is None:
+            raise RuntimeError("Batcher is not running")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(fn, *args))
+
+    async def _collect_batch(self):
+        """
+        Wait for the first request, then keep collecting until the batch is full or the window closes.
+        """
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued before waiting on the clock
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        """
+        Run batches until cancelled, handing each caller its own result.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            # Callers that disconnected while queued don't need a forward pass
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.batch_fn, items)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
@@ -0,0 +1,100 @@
+# deploy/app/bulk.py
+
+# === Imports ===
+import json
+
+# === Record Parsing ===
+
+def parse_record(line_no, line, context_field="context", question=None):
+    """
+    Turn one NDJSON line into a (context, question) request, or return the error it raises.
+    `question` is used for records that don't carry their own.
+    """
+    try:
+        record = json.loads(line)
+    except Exception as e:
+        return {"line": line_no, "id": None, "error": f"Invalid record: {e!r}"}
+    if not isinstance(record, dict):
+        return {"line": line_no, "id": None, "error": "Invalid record: expected a JSON object"}
+
+    record_id = record.get("id")
+    context = record.get(context_field)
+    record_question = record.get("question", question)
+    # Anything but non-empty strings would fail the tokenizer for the whole batch
+    for name, value in [(context_field, context), ("question", record_question)]:
+        if not isinstance(value, str) or not value.strip():
+            return {"line": line_no, "id": record_id, "error": f"Invalid record: `{name}` must be a non-empty string"}
+    return {"line": line_no, "id": record_id, "pair": (context, record_question)}
+
+def iter_records(lines, start_line=0, context_field="context", question=None):
+    """
+    Parse NDJSON lines lazily, skipping blank lines and everything before `start_line`.
+    """
+    for line_no, line in enumerate(lines):
+        if line_no < start_line or not line.strip():
+            continue
+        yield parse_record(line_no, line, context_field, question)
+
+async def aiter_lines(chunks):
+    """
+    Split an async stream of byte chunks into text lines without buffering the whole body.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8")
+    if buffer.strip():
+        yield buffer.decode("utf-8")
+
+# === Batched Answering ===
+
+def answer_records(records, answer_fn):
+    """
+    Answer a batch of parsed records with one call of `answer_fn` and return result dicts
+    in input order. Records that failed to parse or answer carry an `error` instead.
+    """
+    valid = [record for record in records if "pair" in record]
+    answers = iter(answer_fn([record["pair"] for record in valid]) if valid else [])
+
+    results = []
+    for record in records:
+        result = {"line": record["line"], "id": record["id"]}
+        if "error" in record:
+            result["error"] = record["error"]
+        else:
+            answer = next(answers)
+            if isinstance(answer, Exception):
+                result["error"] = str(answer)
+            else:
+                result["answer"] = answer
+        results.append(result)
+    return results
+
+def iter_batches(records, batch_size):
+    """
+    Group an iterable into lists of at most `batch_size` items.
+    """
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def answer_stream(records, answer_fn, batch_size=64):
+    """
+    Answer a stream of parsed records batch by batch, yielding results as soon as each batch
+    is done. Only one batch is held in memory at a time.
+    """
+    for batch in iter_batches(records, batch_size):
+        yield from answer_records(batch, answer_fn)
+
+def to_ndjson(result):
+    """
+    Serialize one result as an NDJSON line.
+    """
+    return json.dumps(result) + "\n"
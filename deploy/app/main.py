@@ -1,32 +1,224 @@
 # deploy/app/main.py
 
 # === Imports ===
-from fastapi import FastAPI, HTTPException
+# Only lightweight imports here: torch/transformers are imported by the background
+# loader so uvicorn can bind the port before the model is ready.
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from model_loader import load_model_and_tokenizer, answer_question
+from batching import MicroBatcher
+from answer_cache import AnswerCache, SqliteCacheBackend, make_cache_key
+import bulk
+
+# === Batching Configuration ===
+# QA_MAX_BATCH_SIZE=1 serves every request with its own forward pass
+MAX_BATCH_SIZE = int(os.getenv("QA_MAX_BATCH_SIZE", "16"))
+MAX_WAIT_MS = float(os.getenv("QA_MAX_WAIT_MS", "5"))
+STREAM_BATCH_SIZE = int(os.getenv("QA_STREAM_BATCH_SIZE", "64"))
+
+# === Cache Configuration ===
+# QA_CACHE_SIZE=0 disables caching; QA_CACHE_SQLITE_PATH shares hits across workers
+CACHE_SIZE = int(os.getenv("QA_CACHE_SIZE", "4096"))
+CACHE_TTL_S = float(os.getenv("QA_CACHE_TTL_S", "3600")) or None
+CACHE_SQLITE_PATH = os.getenv("QA_CACHE_SQLITE_PATH")
+
+# === Model State ===
+# Filled in by the background loader; QA endpoints answer 503 until `ready` is set
+state = {
+    "ready": False,
+    "error": None,
+    "model_loader": None,
+    "tokenizer": None,
+    "model": None,
+    "qa_pipeline": None,
+    "model_id": None,
+    "startup_timings": {},
+}
+
+# === Answer Cache ===
+cache = None
+if CACHE_SIZE > 0:
+    backend = SqliteCacheBackend(CACHE_SQLITE_PATH, ttl_seconds=CACHE_TTL_S) if CACHE_SQLITE_PATH else None
+    cache = AnswerCache(max_entries=CACHE_SIZE, ttl_seconds=CACHE_TTL_S, backend=backend)
+
+def load_model(warm_up=True):
+    """
+    Import the inference stack and load the model, timing each startup phase. With
+    `warm_up=False` the weights are loaded but the app is not marked ready; serve.py uses
+    this to load once in the parent process and warm up in each forked worker.
+    """
+    timings = state["startup_timings"]
+    try:
+        if state["model"] is None:
+            print("--- Loading model...")
+            t0 = time.perf_counter()
+            import model_loader
+            timings["imports"] = time.perf_counter() - t0
+
+            tokenizer, model, qa_pipeline = model_loader.load_model_and_tokenizer(timings=timings)
+            state.update(model_loader=model_loader, tokenizer=tokenizer, model=model, qa_pipeline=qa_pipeline,
+                         model_id=model_loader.model_id())
+        if not warm_up:
+            return
+
+        t0 = time.perf_counter()
+        state["model_loader"].warm_up(state["tokenizer"], state["model"])
+        timings["warm_up"] = time.perf_counter() - t0
+        state["ready"] = True
+        print("--- Model loaded successfully! Startup timings: "
+              + ", ".join(f"{phase}={seconds:.2f}s" for phase, seconds in timings.items()))
+    except Exception as e:
+        state["error"] = str(e)
+        print(f"--- Model loading failed: {e}")
+
+def answer_batch(pairs):
+    """
+    Answer (context, question) pairs with the loaded model, serving repeats from the cache.
+    """
+    if cache is None:
+        return state["model_loader"].answer_questions_batch(pairs, state["tokenizer"], state["model"])
+
+    keys = [make_cache_key(context, question, state["model_id"]) for context, question in pairs]
+    answers = [cache.get(key) for key in keys]
+    misses = [i for i, answer in enumerate(answers) if answer is None]
+    if misses:
+        computed = state["model_loader"].answer_questions_batch(
+            [pairs[i] for i in misses], state["tokenizer"], state["model"]
+        )
+        for i, answer in zip(misses, computed):
+            answers[i] = answer
+            if not isinstance(answer, Exception):
+                cache.put(keys[i], answer)
+    return answers
+
+def require_model():
+    """
+    Reject QA requests until the model has finished loading.
+    """
+    if not state["ready"]:
+        raise HTTPException(status_code=503, detail=state["error"] or "Model is still loading")
+
+# === Request Batching ===
+# Concurrent /qa requests are grouped into a single padded forward pass
+batcher = MicroBatcher(answer_batch, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS)
 
 # === App Initialization ===
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    await batcher.start()
+    # Load in the background so liveness checks pass while weights are read
+    # (workers forked by serve.py already hold the weights and only warm up)
+    loader = asyncio.create_task(run_in_threadpool(load_model))
+    yield
+    await batcher.stop()
+    if not loader.done():
+        loader.cancel()
 
-# === Model Loading (Startup) ===
-# Load model and tokenizer once at startup for efficiency
-print("--- Loading model...")
-tokenizer, model, qa_pipeline = load_model_and_tokenizer()
-print("--- Model loaded successfully!")
+app = FastAPI(lifespan=lifespan)
 
 # === Data Models ===
 class QARequest(BaseModel):
     context: str
     question: str
 
+class QABatchRequest(BaseModel):
+    # Either one context with many questions, or a list of (context, question) items
+    context: Optional[str] = None
+    questions: Optional[List[str]] = None
+    items: Optional[List[QARequest]] = None
+
 # === API Endpoints ===
+@app.get("/healthz")
+def healthz():
+    """
+    Liveness: the process is up and serving HTTP.
+    """
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    """
+    Readiness: the model is loaded and QA requests can be served.
+    """
+    if not state["ready"]:
+        status = "failed" if state["error"] else "loading"
+        return JSONResponse(status_code=503, content={"status": status, "error": state["error"]})
+    return {"status": "ready", "startup_timings": state["startup_timings"]}
+
+@app.get("/cache/stats")
+def cache_stats():
+    """
+    Hit, miss and eviction counters of the answer cache.
+    """
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, "model_id": state["model_id"], **cache.stats()}
+
 @app.post("/qa")
-def get_answer(request: QARequest):
+async def get_answer(request: QARequest):
     """
     Endpoint to get an answer for a given context and question.
     """
+    require_model()
     try:
-        answer = answer_question(request.context, request.question, qa_pipeline)
+        answer = await batcher.submit((request.context, request.question))
         return {"answer": answer}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/qa/batch")
+async def get_answers_batch(request: QABatchRequest):
+    """
+    Endpoint to answer many questions at once. Each distinct context is tokenized once,
+    results come back in request order, and failures are reported per item.
+    """
+    require_model()
+    if request.items is not None and request.questions is None and request.context is None:
+        pairs = [(item.context, item.question) for item in request.items]
+    elif request.items is None and request.questions is not None and request.context is not None:
+        pairs = [(request.context, question) for question in request.questions]
+    else:
+        raise HTTPException(status_code=422, detail="Provide either `context` and `questions`, or `items`.")
+
+    try:
+        # On the batcher's inference thread, so it never runs alongside a /qa batch
+        answers = await batcher.run(answer_batch, pairs)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "results": [
+            {"error": str(answer)} if isinstance(answer, Exception) else {"answer": answer}
+            for answer in answers
+        ]
+    }
+
+@app.post("/qa/stream")
+async def get_answers_stream(request: Request):
+    """
+    Bulk endpoint: NDJSON (context, question) records in, NDJSON results out. Records are
+    read, answered in batches and streamed back incrementally, so memory stays bounded.
+    """
+    require_model()
+
+    async def results():
+        batch = []
+        line_no = 0
+        async for line in bulk.aiter_lines(request.stream()):
+            if line.strip():
+                batch.append(bulk.parse_record(line_no, line))
+            line_no += 1
+            if len(batch) == STREAM_BATCH_SIZE:
+                for result in await batcher.run(bulk.answer_records, batch, answer_batch):
+                    yield bulk.to_ndjson(result)
+                batch = []
+        if batch:
+            for result in await batcher.run(bulk.answer_records, batch, answer_batch):
+                yield bulk.to_ndjson(result)
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
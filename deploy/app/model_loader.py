@@ -1,24 +1,237 @@
 # deploy/app/model_loader.py
 
 # === Imports ===
+import os
+import time
+from collections import namedtuple
 from transformers import pipeline, AutoModelForQuestionAnswering, AutoTokenizer
 import torch
+from src.config import load_config
+from src.model_utils import (
+    build_features, decode_spans, pad_features,
+    quantize_model, load_quantized_model, save_quantized_model, has_quantized_model,
+)
 
 # === Constants ===
-MODEL_PATH = "models/clinicalbert-qa-mixed-v3"
+MODEL_PATH = os.getenv("MODEL_PATH", "models/clinicalbert-qa-mixed-v3")
+BACKEND = os.getenv("QA_BACKEND", "eager")  # eager | torchscript | onnx
+QUANTIZE = os.getenv("QA_QUANTIZE", "0") == "1"  # int8 dynamic quantization (eager backend only)
+ONNX_FILENAME = "model.onnx"
+TORCHSCRIPT_FILENAME = "model.torchscript.pt"
+SAFETENSORS_FILENAME = "model.safetensors"
+CONFIG_PATH = os.getenv("QA_CONFIG_PATH", "configs/train_config.yaml")
+MAX_BATCH_FEATURES = 64  # Upper bound on windows per forward pass
+# Stop reading a document once a window's best span scores at least this (off when unset)
+EARLY_STOP_SCORE = float(os.environ["QA_EARLY_STOP_SCORE"]) if os.getenv("QA_EARLY_STOP_SCORE") else None
+EARLY_STOP_WINDOWS = 4   # Windows per document per forward pass while early stopping is on
+
+# === Windowing Configuration ===
+# Serve with the same windows the model was trained on
+_config = load_config(CONFIG_PATH) if os.path.exists(CONFIG_PATH) else {}
+MAX_LENGTH = _config.get("max_length", 384)
+DOC_STRIDE = _config.get("doc_stride", 128)
+MAX_QUESTION_LENGTH = _config.get("max_question_length")  # Question tokens kept; whole when unset
 
 # === Model Loading Utilities ===
 
-def load_model_and_tokenizer():
+QAOutput = namedtuple("QAOutput", ["start_logits", "end_logits"])
+
+def load_model_and_tokenizer(backend=BACKEND, model_path=MODEL_PATH, quantize=QUANTIZE, timings=None):
     """
     Load the tokenizer and QA model from the specified path, and initialize the QA pipeline.
+    `backend` selects eager PyTorch, a TorchScript trace, or an ONNX Runtime session; the
+    exported backends are produced by scripts/export_model.py. `quantize` serves the eager
+    model with int8 linear layers, loading the saved artifact when there is one.
+    If a `timings` dict is passed, seconds spent per loading phase are recorded in it.
     """
-    tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH)
-    model = AutoModelForQuestionAnswering.from_pretrained(MODEL_PATH)
-    model.to(torch.device("cpu"))  # Cloud Run doesn't support GPU
-    qa_pipeline = pipeline("question-answering", model=model, tokenizer=tokenizer)
+    timings = {} if timings is None else timings
+    t0 = time.perf_counter()
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    timings["tokenizer"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    if backend == "eager":
+        if quantize and has_quantized_model(model_path):
+            model = load_quantized_model(model_path)
+        elif quantize:
+            print("--- No saved int8 artifact found; quantizing the fp32 checkpoint at load time")
+            model = quantize_model(_load_eager_model(model_path))
+        else:
+            model = _load_eager_model(model_path)
+        model.to(torch.device("cpu"))  # Cloud Run doesn't support GPU
+        model.eval()
+        qa_pipeline = pipeline("question-answering", model=model, tokenizer=tokenizer)
+    elif backend == "torchscript":
+        model = TorchScriptQAModel(os.path.join(model_path, TORCHSCRIPT_FILENAME))
+        qa_pipeline = BatchedQAPipeline(tokenizer, model)
+    elif backend == "onnx":
+        model = OnnxQAModel(os.path.join(model_path, ONNX_FILENAME))
+        qa_pipeline = BatchedQAPipeline(tokenizer, model)
+    else:
+        raise ValueError(f"Unknown backend: {backend!r} (expected eager, torchscript or onnx)")
+    timings["weights"] = time.perf_counter() - t0
     return tokenizer, model, qa_pipeline
 
+def model_id(backend=BACKEND, model_path=MODEL_PATH, quantize=QUANTIZE):
+    """
+    Identify the model that produces answers: checkpoint path, serving mode, windowing,
+    and the size and mtime of its weight files, so a retrained checkpoint gets a new id.
+    """
+    parts = [os.path.abspath(model_path), backend, "int8" if quantize else "fp32",
+             f"{MAX_LENGTH}/{DOC_STRIDE}/{EARLY_STOP_SCORE}"]
+    if os.path.isdir(model_path):
+        for name in sorted(os.listdir(model_path)):
+            if name.endswith((".safetensors", ".bin", ".pt", ".onnx")):
+                stat = os.stat(os.path.join(model_path, name))
+                parts.append(f"{name}:{stat.st_size}:{int(stat.st_mtime)}")
+    return "|".join(parts)
+
+def _load_eager_model(model_path):
+    """
+    Load fp32 weights without first allocating a randomly initialized model. Safetensors
+    checkpoints are memory-mapped rather than read into a separate buffer and copied.
+    """
+    has_safetensors = os.path.exists(os.path.join(model_path, SAFETENSORS_FILENAME))
+    return AutoModelForQuestionAnswering.from_pretrained(
+        model_path,
+        low_cpu_mem_usage=True,
+        use_safetensors=True if has_safetensors else None,
+    )
+
+def warm_up(tokenizer, model):
+    """
+    Run one small batch so lazy initialization isn't paid by the first real request.
+    """
+    answer_questions_batch(
+        [("The patient was prescribed metoprolol for hypertension.", "What medication was prescribed?")],
+        tokenizer,
+        model,
+    )
+
+# === Exported Model Backends ===
+
+class TorchScriptQAModel:
+    """
+    Run a traced QA model saved by `export_torchscript` with the eager model's call signature.
+    """
+
+    def __init__(self, path):
+        self.module = torch.jit.load(path, map_location="cpu")
+        self.module.eval()
+
+    def __call__(self, input_ids, token_type_ids, attention_mask):
+        start_logits, end_logits = self.module(input_ids, attention_mask, token_type_ids)
+        return QAOutput(start_logits, end_logits)
+
+class OnnxQAModel:
+    """
+    Run an ONNX graph saved by `export_onnx` on ONNX Runtime with the eager model's call signature.
+    """
+
+    def __init__(self, path):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The onnx backend requires `pip install onnxruntime`.") from e
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def __call__(self, input_ids, token_type_ids, attention_mask):
+        start_logits, end_logits = self.session.run(
+            ["start_logits", "end_logits"],
+            {
+                "input_ids": input_ids.numpy(),
+                "attention_mask": attention_mask.numpy(),
+                "token_type_ids": token_type_ids.numpy(),
+            },
+        )
+        return QAOutput(torch.from_numpy(start_logits), torch.from_numpy(end_logits))
+
+class BatchedQAPipeline:
+    """
+    Stand-in for the HF question-answering pipeline on backends it can't drive.
+    Accepts the same {"context", "question"} input and returns {"answer": ...}.
+    """
+
+    def __init__(self, tokenizer, model):
+        self.tokenizer = tokenizer
+        self.model = model
+
+    def __call__(self, inputs):
+        answer = answer_questions_batch([(inputs["context"], inputs["question"])], self.tokenizer, self.model)[0]
+        if isinstance(answer, Exception):
+            raise answer
+        return {"answer": answer}
+
+# === Export Utilities ===
+
+def _example_inputs(tokenizer):
+    """
+    Build a small example batch used to trace or export the model.
+    """
+    encoded = tokenizer(
+        ["What medication was prescribed?"] * 2,
+        ["The patient was prescribed metoprolol for hypertension."] * 2,
+        return_tensors="pt",
+    )
+    return encoded["input_ids"], encoded["attention_mask"], encoded["token_type_ids"]
+
+def export_torchscript(model_path, output_path):
+    """
+    Trace a trained checkpoint to TorchScript, freeze it for inference and save it.
+    """
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModelForQuestionAnswering.from_pretrained(model_path, torchscript=True)
+    model.eval()
+    with torch.inference_mode():
+        traced = torch.jit.trace(model, _example_inputs(tokenizer))
+    traced = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+    torch.jit.save(traced, output_path)
+    return output_path
+
+def export_quantized(model_path):
+    """
+    Quantize a trained checkpoint's linear layers to int8 and save the artifact next to it.
+    """
+    model = quantize_model(AutoModelForQuestionAnswering.from_pretrained(model_path))
+    return save_quantized_model(model, model_path)
+
+def export_onnx(model_path, output_path, opset=14):
+    """
+    Export a trained checkpoint to ONNX with dynamic batch and sequence axes. When ONNX
+    Runtime is installed, the graph is replaced by its optimized form.
+    """
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModelForQuestionAnswering.from_pretrained(model_path)
+    model.eval()
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in
+                    ["input_ids", "attention_mask", "token_type_ids", "start_logits", "end_logits"]}
+    with torch.inference_mode():
+        torch.onnx.export(
+            model,
+            _example_inputs(tokenizer),
+            output_path,
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["start_logits", "end_logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        print("--- onnxruntime not installed; saved the unoptimized graph")
+        return output_path
+    # Extended (not "all") optimizations keep the saved graph portable across CPUs
+    optimized_path = output_path + ".optimized"
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    options.optimized_model_filepath = optimized_path
+    ort.InferenceSession(output_path, options, providers=["CPUExecutionProvider"])
+    os.replace(optimized_path, output_path)
+    return output_path
+
 # === QA Inference Utility ===
 
 def answer_question(context, question, qa_pipeline):
@@ -26,4 +239,107 @@ def answer_question(context, question, qa_pipeline):
     Use the QA pipeline to answer a question given a context.
     """
     response = qa_pipeline({"context": context, "question": question})
-    return response["answer"]
\ No newline at end of file
+    return response["answer"]
+
+def answer_questions_batch(pairs, tokenizer, model, max_length=MAX_LENGTH, doc_stride=DOC_STRIDE,
+                           max_batch_features=MAX_BATCH_FEATURES, early_stop_score=EARLY_STOP_SCORE,
+                           top_k=None, max_question_length=MAX_QUESTION_LENGTH):
+    """
+    Answer a list of (context, question) pairs in as few padded forward passes as possible.
+    Returns one result per pair, in input order: the answer string, or the exception raised
+    for that pair so callers can report per-item errors. With `top_k` set, each result is
+    instead a list of up to `top_k` {"answer", "score", "start", "end"} candidates.
+
+    All windows of a document normally go through together. With `early_stop_score`
+    set, windows are read EARLY_STOP_WINDOWS at a time per document, and a document's
+    remaining windows are skipped once one of its spans scores at least that much.
+    """
+    if not pairs:
+        return []
+
+    # Identical pairs are answered once and fanned back out at the end
+    unique_pairs = list(dict.fromkeys(pairs))
+    features, errors = build_features(unique_pairs, tokenizer, max_length, doc_stride, max_question_length)
+
+    windows_by_sample = {}
+    for feature in features:
+        windows_by_sample.setdefault(feature["sample_idx"], []).append(feature)
+    most_windows = max((len(windows) for windows in windows_by_sample.values()), default=0)
+    windows_per_round = most_windows if early_stop_score is None else EARLY_STOP_WINDOWS
+
+    candidates = {}
+    resolved = set()
+    for round_start in range(0, most_windows, windows_per_round):
+        round_features = [
+            feature
+            for sample_idx, windows in windows_by_sample.items()
+            if sample_idx not in resolved and sample_idx not in errors
+            for feature in windows[round_start:round_start + windows_per_round]
+        ]
+        # Bucket windows of similar length so each padded chunk wastes little compute
+        round_features.sort(key=lambda feature: len(feature["input_ids"]))
+        for chunk_start in range(0, len(round_features), max_batch_features):
+            chunk = [f for f in round_features[chunk_start:chunk_start + max_batch_features] if f["sample_idx"] not in errors]
+            if not chunk:
+                continue
+            try:
+                start_logits, end_logits, context_mask = _forward(chunk, tokenizer, model)
+            except Exception as e:
+                for feature in chunk:
+                    errors[feature["sample_idx"]] = e
+                continue
+            scores, starts, ends = decode_spans(start_logits, end_logits, context_mask, top_k=top_k or 1)
+            for feature, row_scores, row_starts, row_ends in zip(chunk, scores.tolist(), starts.tolist(), ends.tolist()):
+                sample_idx = feature["sample_idx"]
+                context = unique_pairs[sample_idx][0]
+                offsets = feature["offsets"]
+                for score, start, end in zip(row_scores, row_starts, row_ends):
+                    if score < 0:
+                        break
+                    char_start, char_end = offsets[start][0], offsets[end][1]
+                    candidates.setdefault(sample_idx, []).append(
+                        {"answer": context[char_start:char_end], "score": score, "start": char_start, "end": char_end}
+                    )
+                if early_stop_score is not None and row_scores and row_scores[0] >= early_stop_score:
+                    resolved.add(sample_idx)
+
+    answers = {}
+    for sample_idx, pair in enumerate(unique_pairs):
+        if sample_idx in errors:
+            answers[pair] = errors[sample_idx]
+            continue
+        ranked = _merge_candidates(candidates.get(sample_idx, []), top_k or 1)
+        if top_k is None:
+            answers[pair] = ranked[0]["answer"] if ranked else ""
+        else:
+            answers[pair] = ranked
+    return [answers[pair] for pair in pairs]
+
+def _merge_candidates(candidates, top_k):
+    """
+    Rank spans from all windows of one document, keeping the best score per character span.
+    """
+    ranked = []
+    seen = set()
+    for candidate in sorted(candidates, key=lambda c: c["score"], reverse=True):
+        span = (candidate["start"], candidate["end"])
+        if span not in seen:
+            seen.add(span)
+            ranked.append(candidate)
+        if len(ranked) == top_k:
+            break
+    return ranked
+
+def _forward(features, tokenizer, model):
+    """
+    Pad a list of features and run a single forward pass.
+    Returns start logits, end logits and the padded context mask.
+    """
+    batch = pad_features(features, tokenizer.pad_token_id)
+    with torch.inference_mode():
+        outputs = model(
+            input_ids=batch["input_ids"],
+            token_type_ids=batch["token_type_ids"],
+            attention_mask=batch["attention_mask"],
+        )
+    return outputs.start_logits, outputs.end_logits, batch["context_mask"]
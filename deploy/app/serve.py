@@ -0,0 +1,91 @@
+# deploy/app/serve.py
+
+# === Imports ===
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import uvicorn
+
+# === Configuration ===
+WORKERS = int(os.getenv("QA_WORKERS", "2"))
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8080"))
+
+# === Functions ===
+
+def threads_per_worker(workers):
+    """
+    Split the available cores evenly so workers don't oversubscribe the CPU.
+    """
+    if os.getenv("QA_TORCH_THREADS"):
+        return int(os.environ["QA_TORCH_THREADS"])
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    return max(1, cores // workers)
+
+def run_worker(app_module, sock, num_threads):
+    """
+    Serve the app on an inherited socket inside a forked worker.
+    """
+    import torch
+    torch.set_num_threads(num_threads)
+    config = uvicorn.Config(app_module.app, log_level="info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+def main(workers, host, port):
+    """
+    Load the model once, then fork workers that share its weights copy-on-write.
+    """
+    import torch
+    # Load with a single thread so no OpenMP pool exists in the parent at fork time;
+    # each worker sets its own thread count after forking.
+    torch.set_num_threads(1)
+    torch.set_num_interop_threads(1)
+
+    import main as app_module
+    app_module.load_model(warm_up=False)
+    if app_module.state["model"] is None:
+        sys.exit(f"Model loading failed: {app_module.state['error']}")
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Move everything loaded so far out of the GC's reach, so collections in the
+    # workers don't write to (and un-share) the parent's object pages.
+    gc.freeze()
+
+    num_threads = threads_per_worker(workers)
+    print(f"--- Forking {workers} workers with {num_threads} torch threads each on {host}:{port}")
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(app_module, sock, num_threads)
+            os._exit(0)
+        children.append(pid)
+
+    def stop_children(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop_children)
+    signal.signal(signal.SIGINT, stop_children)
+    for pid in children:
+        os.waitpid(pid, 0)
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the QA API from several workers sharing one copy of the weights.")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+    main(args.workers, args.host, args.port)
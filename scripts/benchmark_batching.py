@@ -0,0 +1,85 @@
+# scripts/benchmark_batching.py
+
+# === Imports ===
+import argparse
+import asyncio
+import json
+import time
+from deploy.app.model_loader import load_model_and_tokenizer, answer_questions_batch
+from deploy.app.batching import MicroBatcher
+
+# === Configuration ===
+DATA_PATH = "data/mixed_eval_synthea_and_real.jsonl"
+
+# === Functions ===
+
+def load_requests(path, n):
+    """
+    Build n (context, question) requests by cycling through an eval set.
+    """
+    with open(path) as f:
+        examples = [json.loads(line) for line in f]
+    return [(examples[i % len(examples)]["context"], examples[i % len(examples)]["question"]) for i in range(n)]
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a list of numbers.
+    """
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[idx]
+
+async def run_load(batcher, requests, concurrency):
+    """
+    Send requests through the batcher from `concurrency` simulated clients and time each one.
+    """
+    latencies = []
+    queue = list(reversed(requests))
+
+    async def client():
+        while queue:
+            pair = queue.pop()
+            t0 = time.perf_counter()
+            await batcher.submit(pair)
+            latencies.append(time.perf_counter() - t0)
+
+    await batcher.start()
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    await batcher.stop()
+    return latencies, elapsed
+
+def benchmark(label, batch_fn, requests, concurrency, max_batch_size, max_wait_ms):
+    """
+    Run one load test and print p50/p99 latency and throughput.
+    """
+    batcher = MicroBatcher(batch_fn, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    latencies, elapsed = asyncio.run(run_load(batcher, requests, concurrency))
+    print(
+        f"{label:<10} | p50: {1000 * percentile(latencies, 50):8.1f} ms"
+        f" | p99: {1000 * percentile(latencies, 99):8.1f} ms"
+        f" | {len(latencies) / elapsed:7.1f} req/s"
+    )
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test /qa batching: batch-1 vs micro-batched inference.")
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    tokenizer, model, _ = load_model_and_tokenizer()
+    requests = load_requests(DATA_PATH, args.requests)
+
+    def batch_fn(pairs):
+        return answer_questions_batch(pairs, tokenizer, model)
+
+    # Warm up once so the first timed batch doesn't pay for lazy initialization
+    batch_fn(requests[:1])
+
+    print(f"{args.requests} requests, {args.concurrency} concurrent clients")
+    benchmark("batch-1", batch_fn, requests, args.concurrency, 1, 0)
+    benchmark("batched", batch_fn, requests, args.concurrency, args.max_batch_size, args.max_wait_ms)
@@ -0,0 +1,91 @@
+# scripts/benchmark_dataset_storage.py
+
+# === Imports ===
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# === Configuration ===
+LEGACY_PATH = "data/processed/synthea_train_dataset.pt"
+ARROW_PATH = "data/processed/synthea_train_dataset"
+SCAN_BATCH_SIZE = 1024
+
+# === Functions ===
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process, in MB (ru_maxrss is KB on Linux, bytes on macOS).
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+def measure(path):
+    """
+    Load a tokenized dataset and scan every training column once, recording time and peak RSS.
+    Runs inside a fresh process so each measurement starts from a clean heap.
+    """
+    import torch  # noqa: F401  (imported before timing so both formats pay the same import cost)
+    from src.data_utils import load_tokenized_dataset
+
+    baseline = peak_rss_mb()
+    t0 = time.perf_counter()
+    dataset = load_tokenized_dataset(path)
+    load_s = time.perf_counter() - t0
+    load_rss = peak_rss_mb()
+
+    t0 = time.perf_counter()
+    for start in range(0, len(dataset), SCAN_BATCH_SIZE):
+        dataset[start:start + SCAN_BATCH_SIZE]
+    scan_s = time.perf_counter() - t0
+    return {
+        "rows": len(dataset),
+        "load_s": load_s,
+        "scan_s": scan_s,
+        "load_rss_mb": load_rss - baseline,
+        "peak_rss_mb": peak_rss_mb() - baseline,
+    }
+
+def measure_in_subprocess(path):
+    """
+    Run `measure` for one path in a child interpreter and return its results.
+    """
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", str(path)], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def convert(legacy_path, arrow_path):
+    """
+    Write the Arrow copy of a legacy `.pt` dataset so both formats hold the same rows.
+    """
+    from src.data_utils import load_tokenized_dataset, save_tokenized_dataset
+    dataset = load_tokenized_dataset(legacy_path)
+    dataset.reset_format()
+    save_tokenized_dataset(dataset, arrow_path)
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare load time and peak RSS of pickled .pt vs Arrow datasets.")
+    parser.add_argument("--legacy-path", default=LEGACY_PATH)
+    parser.add_argument("--arrow-path", default=ARROW_PATH)
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child)))
+        sys.exit(0)
+
+    if not Path(args.arrow_path).exists():
+        convert(args.legacy_path, args.arrow_path)
+
+    print(f"{'format':<8} | {'rows':>7} | {'load':>9} | {'full scan':>9} | {'RSS after load':>14} | {'peak RSS':>9}")
+    for label, path in [("pickle", args.legacy_path), ("arrow", args.arrow_path)]:
+        r = measure_in_subprocess(path)
+        print(
+            f"{label:<8} | {r['rows']:7d} | {r['load_s']:8.2f}s | {r['scan_s']:8.2f}s"
+            f" | {r['load_rss_mb']:11.0f} MB | {r['peak_rss_mb']:6.0f} MB"
+        )
@@ -0,0 +1,78 @@
+# scripts/benchmark_dynamic_padding.py
+
+# === Imports ===
+import argparse
+import time
+import torch
+from torch.utils.data import DataLoader, RandomSampler
+from transformers import AutoTokenizer, AutoModelForQuestionAnswering, DataCollatorWithPadding
+from transformers.trainer_pt_utils import LengthGroupedSampler
+from src.config import load_config
+from src.data_utils import load_tokenized_dataset
+
+# === Configuration ===
+CONFIG_PATH = "configs/train_config.yaml"
+SEED = 42
+
+# === Functions ===
+
+def make_loader(dataset, tokenizer, batch_size, max_length, dynamic):
+    """
+    Fixed mode pads every batch to `max_length` in random order, like the old fixed-length
+    tensors; dynamic mode groups similar lengths and pads to the longest in each batch.
+    """
+    generator = torch.Generator().manual_seed(SEED)
+    if dynamic:
+        sampler = LengthGroupedSampler(batch_size, dataset=dataset, lengths=dataset["length"], generator=generator)
+        collator = DataCollatorWithPadding(tokenizer, pad_to_multiple_of=8)
+    else:
+        sampler = RandomSampler(dataset, generator=generator)
+        collator = DataCollatorWithPadding(tokenizer, padding="max_length", max_length=max_length)
+    return DataLoader(dataset, batch_size=batch_size, sampler=sampler, collate_fn=collator)
+
+def time_steps(model, optimizer, loader, steps):
+    """
+    Time `steps` training steps; returns (seconds, real tokens, padded tokens).
+    """
+    model.train()
+    elapsed, real_tokens, padded_tokens = 0.0, 0, 0
+    for step, batch in enumerate(loader):
+        if step == steps:
+            break
+        t0 = time.perf_counter()
+        loss = model(**batch).loss
+        loss.backward()
+        optimizer.step()
+        optimizer.zero_grad()
+        elapsed += time.perf_counter() - t0
+        real_tokens += int(batch["attention_mask"].sum())
+        padded_tokens += batch["input_ids"].numel()
+    return elapsed, real_tokens, padded_tokens
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare fixed max_length padding with length-grouped dynamic padding.")
+    parser.add_argument("--data-path", default=None, help="Tokenized dataset (default: data_path_new, the combined set)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--steps", type=int, default=30, help="Timed training steps per mode")
+    args = parser.parse_args()
+
+    config = load_config(CONFIG_PATH)
+    dataset = load_tokenized_dataset(args.data_path or config["data_path_new"])
+    tokenizer = AutoTokenizer.from_pretrained(config["model_name"])
+    steps_per_epoch = -(-len(dataset) // args.batch_size)
+    print(f"{len(dataset)} features, batch size {args.batch_size}, {args.steps} timed steps per mode\n")
+
+    for label, dynamic in [("fixed", False), ("dynamic", True)]:
+        torch.manual_seed(SEED)
+        model = AutoModelForQuestionAnswering.from_pretrained(config["model_name"])
+        optimizer = torch.optim.AdamW(model.parameters(), lr=float(config["learning_rate"]))
+        loader = make_loader(dataset, tokenizer, args.batch_size, config["max_length"], dynamic)
+        time_steps(model, optimizer, loader, 1)  # Warm-up
+        elapsed, real_tokens, padded_tokens = time_steps(model, optimizer, loader, args.steps)
+        steps = min(args.steps, steps_per_epoch)
+        print(
+            f"{label:<8} | {real_tokens / elapsed:8.0f} real tokens/s"
+            f" | padding: {100 * (1 - real_tokens / padded_tokens):5.1f}%"
+            f" | ~{steps_per_epoch * elapsed / steps / 60:6.1f} min/epoch"
+        )
@@ -0,0 +1,107 @@
+# scripts/benchmark_generation.py
+
+# === Imports ===
+import argparse
+import asyncio
+import tempfile
+from pathlib import Path
+from src.jsonl_io import read_jsonl
+from src.qa_generation import StubClient, generate_dataset
+
+# === Configuration ===
+NOTES_PATH = "data/raw/mimic/discharge_notes_100.jsonl"
+CONCURRENCY_LEVELS = [1, 4, 8, 16, 32]
+
+# === Functions ===
+
+def make_records(note, text, qa_pairs):
+    return [{"context": text, **qa} for qa in qa_pairs]
+
+def run(notes, concurrency, latency_s, failure_rate, rpm, cache_dir=None, output_path=None):
+    """
+    Generate QA pairs for `notes` against the stub client; returns the run's counters.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = output_path or Path(tmp) / "generated.jsonl"
+        client = StubClient(latency_s=latency_s, failure_rate=failure_rate)
+        return asyncio.run(generate_dataset(
+            notes, client, output_path,
+            note_text=lambda note: note["text"].strip(),
+            make_records=make_records,
+            model="stub",
+            system_prompt="stub",
+            concurrency=concurrency,
+            requests_per_minute=rpm,
+            cache_dir=cache_dir,
+        ))
+
+def check(notes, latency_s=0.05):
+    """
+    Assert the engine's guarantees against the stub client: retries, resume, caching,
+    recovery from a crash between writes, and the rate limit.
+    """
+    # Every 429 is retried, and each call is either a success, a retry or a final failure
+    stats = run(notes, 16, latency_s, 0.2, None)
+    assert stats["retries"] > 0, "429s should be retried"
+    assert stats["api_calls"] == stats["notes"] + stats["retries"] + stats["failed"], stats
+    assert stats["notes"] + stats["failed"] == len(notes), stats
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        output_path = tmp / "generated.jsonl"
+        cache_dir = tmp / "cache"
+        first = run(notes, 16, latency_s, 0.0, None, cache_dir=cache_dir, output_path=output_path)
+        assert first["notes"] == len(notes), first
+
+        # Resumed run over the same output: nothing left to do
+        resumed = run(notes, 16, latency_s, 0.0, None, cache_dir=cache_dir, output_path=output_path)
+        assert resumed["api_calls"] == 0 and resumed["skipped"] == len(notes), resumed
+
+        # Fresh output with the same cache: every response comes from disk, and a corrupt
+        # entry is deleted and fetched again instead of failing the run
+        sorted(cache_dir.glob("*/*.json"))[0].write_text('{"text": "[{')  # Truncated mid-write
+        rerun = run(notes, 16, latency_s, 0.0, None, cache_dir=cache_dir, output_path=tmp / "rerun.jsonl")
+        assert rerun["cached"] == len(notes) - 1 and rerun["api_calls"] == 1 and rerun["failed"] == 0, rerun
+
+        # Crash after a note's records were flushed but before its checkpoint: the resume
+        # drops those records, so the note's records are not duplicated
+        lines = output_path.read_text().splitlines(keepends=True)
+        done_lines = Path(str(output_path) + ".done").read_text().splitlines(keepends=True)
+        last = max(i for i, line in enumerate(done_lines) if not line.startswith("-"))
+        last_note = done_lines[last].split()[0]
+        Path(str(output_path) + ".done").write_text("".join(done_lines[:last]))
+        crashed = run(notes, 16, latency_s, 0.0, None, cache_dir=cache_dir, output_path=output_path)
+        assert crashed["notes"] == 1 and crashed["api_calls"] == 0, crashed
+        assert sorted(output_path.read_text().splitlines(keepends=True)) == sorted(lines), "records duplicated on resume"
+        assert last_note in Path(str(output_path) + ".done").read_text()
+
+    # The token bucket allows one second's burst, then `rpm / 60` calls per second
+    rpm, sample = 600, notes[:30]
+    stats = run(sample, 16, 0.0, 0.0, rpm)
+    floor_s = (len(sample) - rpm / 60) / (rpm / 60)
+    assert stats["elapsed_s"] >= 0.95 * floor_s, f"{stats['elapsed_s']:.2f}s is under the {floor_s:.2f}s rate-limit floor"
+    print("Checks passed: retries, resume, cache hits, corrupt cache entry, crash between writes, rate limit")
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Notes/min of the QA generation engine at several concurrency levels.")
+    parser.add_argument("--latency-s", type=float, default=0.5, help="Simulated API latency per call")
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="Share of calls failing with a 429")
+    parser.add_argument("--rpm", type=float, default=None, help="Rate limit in requests per minute (default: none)")
+    parser.add_argument("--check", action="store_true", help="Only run the correctness checks")
+    args = parser.parse_args()
+
+    notes = read_jsonl(NOTES_PATH)
+    if args.check:
+        check(notes)
+    else:
+        print(f"{len(notes)} notes, {args.latency_s}s latency, {100 * args.failure_rate:.0f}% 429s\n")
+        for concurrency in CONCURRENCY_LEVELS:
+            stats = run(notes, concurrency, args.latency_s, args.failure_rate, args.rpm)
+            print(
+                f"concurrency {concurrency:>3} | {60 * stats['notes'] / stats['elapsed_s']:7.1f} notes/min"
+                f" | retries: {stats['retries']:3d} | failed: {stats['failed']}"
+            )
+
+        print()
+        check(notes)
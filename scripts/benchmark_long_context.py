@@ -0,0 +1,58 @@
+# scripts/benchmark_long_context.py
+
+# === Imports ===
+import argparse
+import json
+import time
+from deploy.app.model_loader import MAX_LENGTH, DOC_STRIDE, load_model_and_tokenizer, answer_questions_batch
+from src.model_utils import build_features
+
+# === Configuration ===
+NOTES_PATH = "data/raw/mimic/discharge_notes_50.jsonl"
+QUESTION = "What was the patient's discharge diagnosis?"
+TOKEN_LENGTHS = [128, 256, 512, 1024, 2048, 4096]
+REPEATS = 3
+
+# === Functions ===
+
+def truncate_to_tokens(text, tokenizer, n_tokens):
+    """
+    Cut a note down to roughly its first n_tokens tokens.
+    """
+    offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+    if len(offsets) <= n_tokens:
+        return text
+    return text[:offsets[n_tokens - 1][1]]
+
+def time_answers(pairs, tokenizer, model, early_stop_score):
+    """
+    Best-of-REPEATS wall time to answer all pairs, in ms per document.
+    """
+    best = float("inf")
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        for pair in pairs:
+            answer_questions_batch([pair], tokenizer, model, early_stop_score=early_stop_score)
+        best = min(best, time.perf_counter() - t0)
+    return 1000 * best / len(pairs)
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure how /qa latency scales with context length.")
+    parser.add_argument("--num-notes", type=int, default=10)
+    parser.add_argument("--early-stop-score", type=float, default=0.5)
+    args = parser.parse_args()
+
+    tokenizer, model, _ = load_model_and_tokenizer()
+    with open(NOTES_PATH) as f:
+        notes = [json.loads(line)["text"] for line in f][:args.num_notes]
+
+    print(f"max_length={MAX_LENGTH}, doc_stride={DOC_STRIDE}, {len(notes)} notes")
+    print(f"{'tokens':>7} | {'windows':>7} | {'all windows':>12} | {'early stop':>12}")
+    for n_tokens in TOKEN_LENGTHS:
+        pairs = [(truncate_to_tokens(note, tokenizer, n_tokens), QUESTION) for note in notes]
+        features, _ = build_features(pairs, tokenizer, MAX_LENGTH, DOC_STRIDE)
+        windows = len(features) / len(pairs)
+        full = time_answers(pairs, tokenizer, model, None)
+        early = time_answers(pairs, tokenizer, model, args.early_stop_score)
+        print(f"{n_tokens:>7} | {windows:>7.1f} | {full:>9.1f} ms | {early:>9.1f} ms")
@@ -0,0 +1,44 @@
+# scripts/benchmark_parallel_eval.py
+
+# === Imports ===
+import argparse
+import time
+from src.config import load_config
+from src.eval_engine import load_examples, start_worker_pool, predict_parallel
+
+# === Configuration ===
+CONFIG_PATH = "configs/eval_config.yaml"
+WORKER_COUNTS = [1, 2, 4, 8]
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark evaluation throughput with 1/2/4/8 worker processes.")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--run", default="mixed", help="Run from the eval config whose model and dataset are used")
+    parser.add_argument("--workers", type=int, nargs="+", default=WORKER_COUNTS)
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    run = config["runs"][args.run]
+    model_path = config["models"][run["model"]]
+    examples = load_examples(config["datasets"][run["dataset"]])
+    batch_size = config.get("batch_size", 32)
+    max_length, doc_stride = config.get("max_length", 384), config.get("doc_stride", 128)
+
+    print(f"{len(examples)} examples, model {model_path}")
+    print(f"{'workers':>7} | {'seconds':>8} | {'examples/s':>10} | speedup | same predictions")
+    baseline_seconds, baseline_predictions = None, None
+    for num_workers in args.workers:
+        # Model loading is excluded from the timing: only inference is compared
+        pool = start_worker_pool(model_path, False, num_workers)
+        predict_parallel(pool, examples[:num_workers], batch_size, max_length, doc_stride, num_workers, 1)
+        t0 = time.perf_counter()
+        predictions = predict_parallel(pool, examples, batch_size, max_length, doc_stride, num_workers)
+        seconds = time.perf_counter() - t0
+        pool.close()
+        pool.join()
+
+        if baseline_seconds is None:
+            baseline_seconds, baseline_predictions = seconds, predictions
+        same = predictions == baseline_predictions
+        print(f"{num_workers:>7} | {seconds:>8.1f} | {len(examples) / seconds:>10.1f} | {baseline_seconds / seconds:>6.2f}x | {same}")
@@ -0,0 +1,71 @@
+# scripts/benchmark_quantization.py
+
+# === Imports ===
+import argparse
+import io
+import json
+import time
+import torch
+from transformers import AutoTokenizer, AutoModelForQuestionAnswering
+from deploy.app.model_loader import MODEL_PATH, answer_questions_batch
+from src.eval_utils import compute_scores
+from src.model_utils import quantize_model, load_quantized_model, has_quantized_model
+
+# === Configuration ===
+EVAL_SETS = [
+    "data/raw/testing/real_qa_test.jsonl",
+    "data/mixed_eval_synthea_and_real.jsonl",
+    "data/raw/synthea/synthea_val.jsonl",
+]
+BATCH_SIZE = 16
+
+# === Functions ===
+
+def model_size_mb(model):
+    """
+    Size of the model's serialized state dict, in MB.
+    """
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes / 1e6
+
+def evaluate(model, tokenizer, examples):
+    """
+    Return (EM, F1, ms per example) for a model on a list of examples.
+    """
+    pairs = [(ex["context"], ex["question"]) for ex in examples]
+    answer_questions_batch(pairs[:1], tokenizer, model)  # Warm-up
+    predictions = []
+    t0 = time.perf_counter()
+    for i in range(0, len(pairs), BATCH_SIZE):
+        predictions.extend(answer_questions_batch(pairs[i:i + BATCH_SIZE], tokenizer, model))
+    elapsed = time.perf_counter() - t0
+    ems, f1s = compute_scores(predictions, [ex["answer_text"] for ex in examples])
+    em, f1 = 100 * sum(ems) / len(ems), 100 * sum(f1s) / len(f1s)
+    return em, f1, 1000 * elapsed / len(examples)
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare fp32 and int8 dynamic-quantized models: size, latency, EM/F1.")
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument("--eval-sets", nargs="+", default=EVAL_SETS)
+    args = parser.parse_args()
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model_path)
+    fp32 = AutoModelForQuestionAnswering.from_pretrained(args.model_path).eval()
+    if has_quantized_model(args.model_path):
+        int8 = load_quantized_model(args.model_path)
+    else:
+        print("No saved int8 artifact found; quantizing in memory")
+        int8 = quantize_model(AutoModelForQuestionAnswering.from_pretrained(args.model_path))
+
+    print(f"Model size  | fp32: {model_size_mb(fp32):7.1f} MB | int8: {model_size_mb(int8):7.1f} MB")
+    for path in args.eval_sets:
+        with open(path) as f:
+            examples = [json.loads(line) for line in f]
+        em32, f132, ms32 = evaluate(fp32, tokenizer, examples)
+        em8, f18, ms8 = evaluate(int8, tokenizer, examples)
+        print(f"\n{path} ({len(examples)} examples)")
+        print(f"  fp32 | EM: {em32:6.2f} | F1: {f132:6.2f} | {ms32:7.2f} ms/example")
+        print(f"  int8 | EM: {em8:6.2f} | F1: {f18:6.2f} | {ms8:7.2f} ms/example")
+        print(f"  delta| EM: {em8 - em32:+6.2f} | F1: {f18 - f132:+6.2f} | {ms32 / ms8:4.2f}x faster")
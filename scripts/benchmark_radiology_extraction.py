@@ -0,0 +1,91 @@
+# scripts/benchmark_radiology_extraction.py
+
+# === Imports ===
+import argparse
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from scripts.extract_radiology_samples import (
+    CLINICAL_KEYWORDS, MIN_REPORT_LENGTH, NUM_SAMPLES, RANDOM_SEED, extract_samples, informative_mask, to_records
+)
+
+# === Configuration ===
+FILLER_WORDS = ["the", "chest", "radiograph", "shows", "no", "change", "stable", "heart", "size", "normal",
+                "lungs", "clear", "bilateral", "views", "compared", "prior", "study", "findings"]
+
+# === Functions ===
+
+def is_informative(report):
+    """The original per-report check, kept as the reference for the vectorized mask."""
+    if not isinstance(report, str) or len(report) < MIN_REPORT_LENGTH:
+        return False
+    report_lower = report.lower()
+    return "impression" in report_lower or any(kw in report_lower for kw in CLINICAL_KEYWORDS)
+
+def write_synthetic_csv(path, num_rows, seed=0):
+    """
+    Write a CSV of synthetic reports: random filler text of varying length, with a clinical
+    keyword (in random case) mixed into about a third of them.
+    """
+    rng = np.random.default_rng(seed)
+    vocab = np.array(FILLER_WORDS)
+    keywords = np.array(CLINICAL_KEYWORDS + ["IMPRESSION:"])
+    for start in range(0, num_rows, 100_000):
+        n = min(100_000, num_rows - start)
+        lengths = rng.integers(10, 120, n)
+        words = vocab[rng.integers(0, len(vocab), lengths.sum())]
+        reports = [" ".join(chunk) for chunk in np.split(words, np.cumsum(lengths)[:-1])]
+        with_keyword = rng.random(n) < 0.35
+        picks = keywords[rng.integers(0, len(keywords), n)]
+        reports = [
+            f"{r} {kw.upper() if i % 2 else kw}." if flag else r
+            for i, (r, flag, kw) in enumerate(zip(reports, with_keyword, picks))
+        ]
+        pd.DataFrame({
+            "subject_id": np.arange(start, start + n) + 10_000_000,
+            "study_id": np.arange(start, start + n) + 50_000_000,
+            "report": reports,
+        }).to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+
+def original_pipeline(csv_path, num_samples, seed):
+    """The original full-load, apply-and-iterrows pipeline, for timing."""
+    df = pd.read_csv(csv_path)
+    filtered = df[df["report"].apply(is_informative)].copy()
+    sampled = filtered.sample(min(num_samples, len(filtered)), random_state=seed)
+    return [
+        {"subject_id": row.get("subject_id", None), "study_id": row.get("study_id", None), "report": row["report"]}
+        for _, row in sampled.iterrows()
+    ], len(filtered)
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark radiology report filtering and sampling on a synthetic CSV.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "reports.csv"
+        t0 = time.perf_counter()
+        write_synthetic_csv(csv_path, args.rows)
+        print(f"Wrote {args.rows} synthetic reports in {time.perf_counter() - t0:.1f}s\n")
+
+        t0 = time.perf_counter()
+        _, original_count = original_pipeline(csv_path, NUM_SAMPLES, RANDOM_SEED)
+        print(f"original   | {time.perf_counter() - t0:6.1f}s | {original_count} informative")
+
+        t0 = time.perf_counter()
+        sample, count = extract_samples(csv_path, NUM_SAMPLES, RANDOM_SEED)
+        records = to_records(sample)
+        print(f"vectorized | {time.perf_counter() - t0:6.1f}s | {count} informative")
+
+        # Same filter as the per-report check, and the same sample however the file is chunked
+        head = pd.read_csv(csv_path, nrows=100_000)["report"]
+        assert informative_mask(head).tolist() == head.apply(is_informative).tolist(), "filter mismatch"
+        for reports in (pd.Series([np.nan] * 3), pd.Series([np.nan, 1234.5, "IMPRESSION: " + "x" * MIN_REPORT_LENGTH])):
+            assert informative_mask(reports).tolist() == reports.apply(is_informative).tolist(), "missing-report mismatch"
+        assert count == original_count, "informative counts differ"
+        rechunked, _ = extract_samples(csv_path, NUM_SAMPLES, RANDOM_SEED, chunk_size=37_000)
+        assert to_records(rechunked) == records, "sample depends on chunk size"
+        print(f"\nfilter identical to the per-report check; {len(records)}-report sample identical across chunk sizes")
@@ -0,0 +1,191 @@
+# scripts/benchmark_span_alignment.py
+
+# === Imports ===
+import argparse
+import re
+import time
+from transformers import AutoTokenizer
+from src.config import load_config
+from src.data_utils import load_qa_dataset, prepare_train_features
+from src.jsonl_io import QA_SCHEMA, iter_jsonl
+
+# === Configuration ===
+CONFIG_PATH = "configs/train_config.yaml"
+CHECK_PATHS = ["data/synthea_train.jsonl"]
+CHECK_DATASETS = ["mimic_2", "radiology"]  # Raw files resolved through data_path_<name>
+BENCHMARK_DATASET = "mimic_2"
+BATCH_SIZE = 1000  # Same as Dataset.map's default batch
+# Small windows for the synthetic cases, so one context spans many overlapping features
+EDGE_CASE_WINDOW = {"max_length": 48, "doc_stride": 16}
+EDGE_CASE_CONTEXT = (
+    "Patient is a 67-year-old male admitted with chest pain radiating to the left arm. "
+    "Troponin was elevated at 0.45 ng/mL and ECG showed ST depression in leads V4-V6. "
+    "He was started on aspirin, heparin and metoprolol, and cardiology was consulted. "
+    "Cardiac catheterization revealed 90% stenosis of the LAD, treated with a drug-eluting stent. "
+    "Discharged on dual antiplatelet therapy with follow-up in two weeks."
+)
+
+# === Functions ===
+
+def prepare_train_features_reference(examples, tokenizer, config):
+    """
+    The original per-feature loop, kept as the reference labels must match.
+    """
+    tokenized_examples = tokenizer(
+        examples["question"],
+        examples["context"],
+        truncation="only_second",
+        max_length=config["max_length"],
+        stride=config["doc_stride"],
+        return_overflowing_tokens=True,
+        return_offsets_mapping=True,
+        padding="max_length",
+    )
+
+    sample_mapping = tokenized_examples.pop("overflow_to_sample_mapping")
+    offset_mapping = tokenized_examples["offset_mapping"]
+
+    start_positions = []
+    end_positions = []
+
+    for i, offsets in enumerate(offset_mapping):
+        input_ids = tokenized_examples["input_ids"][i]
+        cls_index = input_ids.index(tokenizer.cls_token_id)
+
+        sample_idx = sample_mapping[i]
+        answer = examples["answer_text"][sample_idx]
+        start_char = examples["answer_start"][sample_idx]
+        end_char = start_char + len(answer)
+
+        sequence_ids = tokenized_examples.sequence_ids(i)
+        context_start = sequence_ids.index(1)
+        context_end = len(sequence_ids) - 1 - sequence_ids[::-1].index(1)
+
+        if not (offsets[context_start][0] <= start_char and offsets[context_end][1] >= end_char):
+            start_positions.append(cls_index)
+            end_positions.append(cls_index)
+        else:
+            token_start = context_start
+            token_end = context_end
+            while token_start < len(offsets) and offsets[token_start][0] <= start_char:
+                token_start += 1
+            while token_end >= 0 and offsets[token_end][1] >= end_char:
+                token_end -= 1
+            start_positions.append(token_start - 1)
+            end_positions.append(token_end + 1)
+
+    tokenized_examples["start_positions"] = start_positions
+    tokenized_examples["end_positions"] = end_positions
+    return tokenized_examples
+
+def batches(dataset):
+    """
+    Yield column-dict batches the way `Dataset.map(batched=True)` passes them.
+    """
+    for start in range(0, len(dataset), BATCH_SIZE):
+        yield dataset[start:start + BATCH_SIZE]
+
+def raw_batches(path):
+    """
+    Column-dict batches straight from a JSONL file, without span validation, so misaligned
+    and out-of-range `answer_start` values reach the aligner as they are. Records with a
+    missing or mistyped field, or an empty context, are skipped: neither implementation
+    can tokenize them.
+    """
+    batch = {field: [] for field in QA_SCHEMA}
+    for record in iter_jsonl(path, schema=QA_SCHEMA, skip_invalid=True):
+        if not record["context"]:
+            continue
+        for field in QA_SCHEMA:
+            batch[field].append(record[field])
+        if len(batch["context"]) == BATCH_SIZE:
+            yield batch
+            batch = {field: [] for field in QA_SCHEMA}
+    if batch["context"]:
+        yield batch
+
+def edge_cases(context=EDGE_CASE_CONTEXT):
+    """
+    One batch of synthetic examples over a single context: every word and three-word span
+    as the answer (so some straddle each window boundary and most fall outside any given
+    window), the context's last word, spans shifted off word boundaries, and offsets
+    before the start or past the end of the context.
+    """
+    words = [(m.start(), m.end()) for m in re.finditer(r"\S+", context)]
+    spans = list(words)
+    spans += [(words[i][0], words[i + 2][1]) for i in range(len(words) - 2)]
+    spans += [(start + 1, end) for start, end in words if end - start > 1]
+    spans += [(start - 1, end - 1) for start, end in words[1:]]
+    spans += [(0, len(context)), (len(context) - 1, len(context))]
+    answers = [(context[start:end], start) for start, end in spans]
+    # Text the offset doesn't point at: negative, at the end, and beyond the context
+    answers += [(context[:5], -3), (context[-5:], len(context)), (context[-5:], len(context) + 40)]
+    answers += [(context[start:end], start + 7) for start, end in words[::5]]
+    return {
+        "question": ["What was found?"] * len(answers),
+        "context": [context] * len(answers),
+        "answer_text": [text for text, _ in answers],
+        "answer_start": [start for _, start in answers],
+    }
+
+def check(label, batches, tokenizer, config):
+    """
+    Assert the vectorized aligner reproduces the reference labels for every feature.
+    """
+    features = 0
+    for batch in batches:
+        expected = prepare_train_features_reference(batch, tokenizer, config)
+        actual = prepare_train_features(batch, tokenizer, config)
+        for key in ("start_positions", "end_positions"):
+            mismatches = [i for i, (a, b) in enumerate(zip(actual[key], expected[key])) if a != b]
+            assert len(actual[key]) == len(expected[key]) and not mismatches, (
+                f"{label}: {key} differs for features {mismatches[:10]}"
+            )
+        features += len(expected["start_positions"])
+    assert features, f"{label}: no features to compare"
+    print(f"identical labels for {features} features: {label}")
+
+def check_all(tokenizer, config):
+    """
+    Compare both aligners on the validated and raw data files, then on the synthetic edge
+    cases at the configured window and at a small one.
+    """
+    paths = CHECK_PATHS + [config[f"data_path_{name}"] for name in CHECK_DATASETS]
+    for path in paths:
+        check(path, batches(load_qa_dataset(path)), tokenizer, config)
+        check(f"{path} (raw)", raw_batches(path), tokenizer, config)
+    small_window = {**config, **EDGE_CASE_WINDOW}
+    check("edge cases", [edge_cases()], tokenizer, config)
+    check(f"edge cases (max_length={small_window['max_length']})", [edge_cases()], tokenizer, small_window)
+
+def time_alignment(label, fn, dataset, tokenizer, config):
+    """
+    Time one full pass of `fn` over a dataset.
+    """
+    t0 = time.perf_counter()
+    features = sum(len(fn(batch, tokenizer, config)["start_positions"]) for batch in batches(dataset))
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<10} | {elapsed:7.2f}s | {features / elapsed:8.0f} features/s")
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and benchmark vectorized answer-span alignment.")
+    parser.add_argument("--check", action="store_true", help="Only compare labels against the reference, no timing")
+    parser.add_argument("--skip-check", action="store_true")
+    args = parser.parse_args()
+    if args.check and args.skip_check:
+        parser.error("--check and --skip-check are mutually exclusive")
+
+    # The reference pads every feature to max_length; compare in that mode
+    config = {**load_config(CONFIG_PATH), "pad_to_max_length": True}
+    tokenizer = AutoTokenizer.from_pretrained(config["model_name"], use_fast=True)
+
+    if not args.skip_check:
+        check_all(tokenizer, config)
+    if args.check:
+        raise SystemExit(0)
+
+    dataset = load_qa_dataset(config[f"data_path_{BENCHMARK_DATASET}"])
+    print(f"\n{len(dataset)} examples from {config[f'data_path_{BENCHMARK_DATASET}']} (tokenization included)")
+    time_alignment("loop", prepare_train_features_reference, dataset, tokenizer, config)
+    time_alignment("numpy", prepare_train_features, dataset, tokenizer, config)
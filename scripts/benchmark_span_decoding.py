@@ -0,0 +1,96 @@
+# scripts/benchmark_span_decoding.py
+
+# === Imports ===
+import argparse
+import json
+import time
+import numpy as np
+import torch
+from deploy.app.model_loader import load_model_and_tokenizer, answer_question, answer_questions_batch
+from src.model_utils import MAX_ANSWER_LENGTH, decode_spans
+
+# === Configuration ===
+EVAL_SETS = [
+    "data/raw/testing/real_qa_test.jsonl",
+    "data/mixed_eval_synthea_and_real.jsonl",
+    "data/raw/radiology/generated_radiology_qa_400.jsonl",
+]
+BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64]
+SEQ_LEN = 384
+REPEATS = 5
+
+# === Functions ===
+
+def decode_spans_loop(start_logits, end_logits, context_mask, max_answer_length=MAX_ANSWER_LENGTH):
+    """
+    Per-example NumPy decoding in the style of the HF pipeline, used as the baseline.
+    """
+    results = []
+    for start, end, mask in zip(start_logits.numpy(), end_logits.numpy(), context_mask.numpy()):
+        start = np.where(mask, start, -10000.0)
+        end = np.where(mask, end, -10000.0)
+        start = np.exp(start - start.max())
+        start /= start.sum()
+        end = np.exp(end - end.max())
+        end /= end.sum()
+        outer = np.tril(np.triu(np.outer(start, end)), max_answer_length - 1)
+        outer *= np.outer(mask, mask)
+        s, e = np.unravel_index(np.argmax(outer), outer.shape)
+        results.append((float(outer[s, e]), int(s), int(e)))
+    return results
+
+def best_of(fn, repeats=REPEATS):
+    """
+    Best-of-N wall time of a call, in ms.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return 1000 * best
+
+def benchmark_decoding():
+    """
+    Time loop vs vectorized decoding on random logits and check they pick the same spans.
+    """
+    generator = torch.Generator().manual_seed(0)
+    print(f"{'batch':>5} | {'loop':>9} | {'vectorized':>10} | speedup | same spans")
+    for batch_size in BATCH_SIZES:
+        start_logits = torch.randn(batch_size, SEQ_LEN, generator=generator)
+        end_logits = torch.randn(batch_size, SEQ_LEN, generator=generator)
+        context_mask = torch.zeros(batch_size, SEQ_LEN, dtype=torch.bool)
+        context_mask[:, 20:SEQ_LEN - 1] = True
+
+        loop_ms = best_of(lambda: decode_spans_loop(start_logits, end_logits, context_mask))
+        vec_ms = best_of(lambda: decode_spans(start_logits, end_logits, context_mask))
+
+        expected = [(s, e) for _, s, e in decode_spans_loop(start_logits, end_logits, context_mask)]
+        _, starts, ends = decode_spans(start_logits, end_logits, context_mask)
+        same = expected == list(zip(starts[:, 0].tolist(), ends[:, 0].tolist()))
+        print(f"{batch_size:>5} | {loop_ms:>6.2f} ms | {vec_ms:>7.2f} ms | {loop_ms / vec_ms:>6.1f}x | {same}")
+
+def check_pipeline_parity(eval_sets):
+    """
+    Compare answers from the batched decoder against the HF pipeline on the eval sets.
+    """
+    tokenizer, model, qa_pipeline = load_model_and_tokenizer(backend="eager")
+    for path in eval_sets:
+        with open(path) as f:
+            examples = [json.loads(line) for line in f]
+        pairs = [(ex["context"], ex["question"]) for ex in examples]
+        expected = [answer_question(context, question, qa_pipeline) for context, question in pairs]
+        predicted = answer_questions_batch(pairs, tokenizer, model)
+        same = sum(p.strip() == e.strip() for p, e in zip(predicted, expected))
+        print(f"{path}: {same}/{len(pairs)} answers identical to the pipeline")
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark vectorized span decoding and check it against the HF pipeline.")
+    parser.add_argument("--check-pipeline", action="store_true", help="Also compare answers with the pipeline (loads the model)")
+    parser.add_argument("--eval-sets", nargs="+", default=EVAL_SETS)
+    args = parser.parse_args()
+
+    benchmark_decoding()
+    if args.check_pipeline:
+        check_pipeline_parity(args.eval_sets)
@@ -0,0 +1,115 @@
+# scripts/benchmark_workers.py
+
+# === Imports ===
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# === Configuration ===
+DATA_PATH = "data/mixed_eval_synthea_and_real.jsonl"
+WORKER_COUNTS = [1, 2, 4]
+PORT = 8765
+
+# === Functions ===
+
+def wait_until_ready(port, timeout=600):
+    """
+    Poll /readyz until a run of consecutive probes succeeds, so every worker has warmed up.
+    """
+    deadline = time.time() + timeout
+    streak = 0
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=5) as response:
+                streak = streak + 1 if response.status == 200 else 0
+        except (urllib.error.URLError, ConnectionError):
+            streak = 0
+        if streak >= 20:
+            return
+        time.sleep(0.1 if streak else 1.0)
+    raise TimeoutError("Server did not become ready")
+
+def memory_kb(pid):
+    """
+    (RSS, PSS) of a process in kB; PSS splits shared pages between the processes sharing them.
+    """
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0]] = int(parts[1])
+    return values["Rss:"], values["Pss:"]
+
+def worker_pids(parent_pid):
+    """
+    PIDs of the workers forked by serve.py.
+    """
+    with open(f"/proc/{parent_pid}/task/{parent_pid}/children") as f:
+        return [int(pid) for pid in f.read().split()]
+
+def post_qa(port, payload):
+    """
+    Send one /qa request (cache disabled on the server, so every request runs the model).
+    """
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/qa",
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=120) as response:
+        response.read()
+
+def run(workers, payloads, concurrency):
+    """
+    Start serve.py with N workers and measure memory per worker and throughput.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(["deploy/app", "."]), QA_CACHE_SIZE="0")
+    server = subprocess.Popen(
+        [sys.executable, "deploy/app/serve.py", "--workers", str(workers), "--port", str(PORT), "--host", "127.0.0.1"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(PORT)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda payload: post_qa(PORT, payload), payloads))
+        throughput = len(payloads) / (time.perf_counter() - t0)
+
+        pids = worker_pids(server.pid)
+        memory = [memory_kb(pid) for pid in pids]
+        parent_rss, parent_pss = memory_kb(server.pid)
+        rss = sum(m[0] for m in memory) / len(memory) / 1024
+        pss = sum(m[1] for m in memory) / len(memory) / 1024
+        total_pss = (parent_pss + sum(m[1] for m in memory)) / 1024
+        print(f"{workers:>7} | {rss:>8.0f} MB | {pss:>8.0f} MB | {total_pss:>9.0f} MB | {throughput:>7.1f} req/s")
+    finally:
+        server.terminate()
+        server.wait()
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark memory per worker and throughput of serve.py.")
+    parser.add_argument("--workers", type=int, nargs="+", default=WORKER_COUNTS)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    with open(DATA_PATH) as f:
+        examples = [json.loads(line) for line in f]
+    payloads = [
+        {"context": examples[i % len(examples)]["context"], "question": examples[i % len(examples)]["question"]}
+        for i in range(args.requests)
+    ]
+
+    print(f"{'workers':>7} | {'RSS/wkr':>11} | {'PSS/wkr':>11} | {'total PSS':>12} | throughput")
+    for workers in args.workers:
+        run(workers, payloads, args.concurrency)
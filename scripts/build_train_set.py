@@ -0,0 +1,37 @@
+# scripts/build_train_set.py
+
+# === Imports ===
+import argparse
+import os
+from transformers import AutoTokenizer
+from src.config import load_config
+from src.dataset_shards import build_incremental, load_manifest, manifest_keys, prune_shards
+
+# === Configuration ===
+CONFIG_PATH = "configs/train_config.yaml"
+
+# === Main Logic ===
+if __name__ == "__main__":
+    config = load_config(CONFIG_PATH)
+    build = config["incremental_build"]
+
+    parser = argparse.ArgumentParser(description="Incrementally tokenize source JSONL files into content-addressed shards.")
+    parser.add_argument("--sources", nargs="+", default=build["sources"],
+                        help="Dataset names; data_path_<name> is read for each. Other sources already in the "
+                             "manifest are kept")
+    parser.add_argument("--manifest", default=build["manifest_path"])
+    parser.add_argument("--num-proc", type=int, default=config.get("preprocess_num_proc") or os.cpu_count())
+    parser.add_argument("--prune", action="store_true", help="Delete shards the manifest listed before this build but no longer does")
+    args = parser.parse_args()
+
+    # Each worker tokenizes on one thread instead of oversubscribing the CPU
+    if args.num_proc > 1:
+        os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+    tokenizer = AutoTokenizer.from_pretrained(config["model_name"], use_fast=True)
+    sources = {name: config[f"data_path_{name}"] for name in args.sources}
+    previous_keys = manifest_keys(load_manifest(args.manifest))
+    manifest = build_incremental(sources, config, tokenizer, build["shard_dir"], args.manifest, num_proc=args.num_proc)
+
+    if args.prune:
+        prune_shards(build["shard_dir"], [manifest], candidates=previous_keys)
@@ -0,0 +1,121 @@
+# scripts/bulk_answer.py
+
+# === Imports ===
+import argparse
+import json
+import os
+import tempfile
+from deploy.app.bulk import iter_records, answer_stream, iter_batches, to_ndjson
+
+# === Functions ===
+
+def resume_point(output_path):
+    """
+    Find the input line to resume from, dropping a partially written last line.
+    """
+    if not os.path.exists(output_path):
+        return 0
+    last_line = -1
+    valid_bytes = 0
+    with open(output_path, "rb") as f:
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                last_line = json.loads(raw)["line"]
+            except (ValueError, KeyError):
+                break
+            valid_bytes += len(raw)
+    # Cut off whatever a crash left behind after the last complete result
+    with open(output_path, "r+b") as f:
+        f.truncate(valid_bytes)
+    return last_line + 1
+
+def run(input_path, output_path, batch_size, context_field, question, answer_fn=None):
+    """
+    Answer every record of a JSONL file, appending results and resuming after a crash.
+    `answer_fn(pairs)` defaults to the served model.
+    """
+    start_line = resume_point(output_path)
+    if start_line:
+        print(f"Resuming from input line {start_line}")
+
+    if answer_fn is None:
+        # Imported here so --self-check runs without the model stack
+        from deploy.app.model_loader import load_model_and_tokenizer, answer_questions_batch
+        tokenizer, model, _ = load_model_and_tokenizer()
+
+        def answer_fn(pairs):
+            return answer_questions_batch(pairs, tokenizer, model)
+
+    done = 0
+    with open(input_path) as fin, open(output_path, "a") as fout:
+        records = iter_records(fin, start_line=start_line, context_field=context_field, question=question)
+        for results in iter_batches(answer_stream(records, answer_fn, batch_size), batch_size):
+            fout.writelines(to_ndjson(result) for result in results)
+            # A batch only counts as completed once it is on disk
+            fout.flush()
+            os.fsync(fout.fileno())
+            done += len(results)
+            print(f"Answered {done} records (through input line {results[-1]['line']})")
+    print(f"Saved answers to: {output_path}")
+
+def self_check(batch_size=2):
+    """
+    Answer a sample with malformed lines using a stub model, cut the output off mid-line as
+    a crash would, resume, and check every line is answered or rejected exactly once.
+    """
+    sample = [
+        {"id": "a", "context": "The patient was prescribed metoprolol.", "question": "What medication?"},
+        "not json",
+        ["a", "list"],
+        {"id": "b", "context": 5, "question": "q"},
+        {"id": "c", "text": None},
+        {"id": "d", "context": "Some context.", "question": "   "},
+        {"id": "e", "context": "Chest X-ray shows a small effusion.", "question": "What is seen?"},
+    ]
+    bad_ids = {1, 2, 3, 4, 5}
+
+    def stub_answer_fn(pairs):
+        return [context.split()[1] for context, _ in pairs]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path, output_path = os.path.join(tmp, "in.jsonl"), os.path.join(tmp, "out.jsonl")
+        with open(input_path, "w") as f:
+            f.writelines((r if isinstance(r, str) else json.dumps(r)) + "\n" for r in sample)
+
+        run(input_path, output_path, batch_size, "context", None, answer_fn=stub_answer_fn)
+        with open(output_path, "rb") as f:
+            complete = f.read()
+        # Keep the first batch plus half of the next line
+        first_batch = b"".join(complete.splitlines(keepends=True)[:batch_size])
+        with open(output_path, "wb") as f:
+            f.write(first_batch + complete[len(first_batch):len(first_batch) + 10])
+
+        run(input_path, output_path, batch_size, "context", None, answer_fn=stub_answer_fn)
+        with open(output_path) as f:
+            results = [json.loads(line) for line in f]
+
+    assert [r["line"] for r in results] == list(range(len(sample))), "each line answered exactly once, in order"
+    for r in results:
+        assert ("error" in r) == (r["line"] in bad_ids), f"unexpected result for line {r['line']}: {r}"
+    assert results[0]["answer"] == "patient" and results[-1]["answer"] == "X-ray"
+    print(f"Self-check passed: {len(results)} results, {len(bad_ids)} rejected, resumed after a partial write")
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions in bulk, resumably.")
+    parser.add_argument("--input")
+    parser.add_argument("--output")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--context-field", default="context", help="e.g. `text` for discharge_notes_*.jsonl")
+    parser.add_argument("--question", default=None, help="Question to ask of records that don't have one")
+    parser.add_argument("--self-check", action="store_true",
+                        help="Check parsing and resume on a sample with malformed lines (no model needed)")
+    args = parser.parse_args()
+    if args.self_check:
+        self_check()
+    elif not args.input or not args.output:
+        parser.error("--input and --output are required")
+    else:
+        run(args.input, args.output, args.batch_size, args.context_field, args.question)
@@ -0,0 +1,66 @@
+# scripts/check_backend_parity.py
+
+# === Imports ===
+import argparse
+import json
+import sys
+import time
+from deploy.app.model_loader import MODEL_PATH, load_model_and_tokenizer, answer_questions_batch
+from src.eval_utils import compute_scores
+
+# === Configuration ===
+DATA_PATH = "data/mixed_eval_synthea_and_real.jsonl"
+BATCH_SIZE = 16
+
+# === Functions ===
+
+def run_backend(backend, model_path, examples):
+    """
+    Answer every example with one backend and return (predictions, seconds per example).
+    """
+    tokenizer, model, _ = load_model_and_tokenizer(backend=backend, model_path=model_path)
+    pairs = [(ex["context"], ex["question"]) for ex in examples]
+    answer_questions_batch(pairs[:1], tokenizer, model)  # Warm-up
+
+    predictions = []
+    t0 = time.perf_counter()
+    for i in range(0, len(pairs), BATCH_SIZE):
+        predictions.extend(answer_questions_batch(pairs[i:i + BATCH_SIZE], tokenizer, model))
+    return predictions, (time.perf_counter() - t0) / len(pairs)
+
+def score(predictions, examples):
+    """
+    Compute EM and F1 (in percent) of predictions against the reference answers.
+    """
+    ems, f1s = compute_scores(predictions, [ex["answer_text"] for ex in examples])
+    return 100 * sum(ems) / len(ems), 100 * sum(f1s) / len(f1s)
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that exported backends match eager EM/F1 and compare latency.")
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument("--backends", nargs="+", default=["torchscript", "onnx"])
+    parser.add_argument("--data-path", default=DATA_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Maximum EM/F1 difference in points")
+    args = parser.parse_args()
+
+    with open(args.data_path) as f:
+        examples = [json.loads(line) for line in f]
+
+    reference, eager_latency = run_backend("eager", args.model_path, examples)
+    eager_em, eager_f1 = score(reference, examples)
+    print(f"{'eager':<12} | EM: {eager_em:6.2f} | F1: {eager_f1:6.2f} | {1000 * eager_latency:7.2f} ms/example")
+
+    failed = False
+    for backend in args.backends:
+        predictions, latency = run_backend(backend, args.model_path, examples)
+        em, f1 = score(predictions, examples)
+        agreement = 100 * sum(p == r for p, r in zip(predictions, reference)) / len(reference)
+        ok = abs(em - eager_em) <= args.tolerance and abs(f1 - eager_f1) <= args.tolerance
+        failed = failed or not ok
+        print(
+            f"{backend:<12} | EM: {em:6.2f} | F1: {f1:6.2f} | {1000 * latency:7.2f} ms/example"
+            f" | {eager_latency / latency:4.2f}x | same answer: {agreement:.1f}% | {'OK' if ok else 'MISMATCH'}"
+        )
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,111 @@
+# scripts/check_jsonl_parity.py
+
+# === Imports ===
+import argparse
+import sys
+from pathlib import Path
+from src import jsonl_io
+
+# === Configuration ===
+DATA_DIR = "data"
+# Lines orjson refuses; the standard-library fallback must refuse them too
+INVALID_LINES = [
+    b'{"score": NaN}',
+    b'{"score": Infinity}',
+    b'{"score": -Infinity}',
+    b'[NaN]',
+    b'{"a": 1,}',
+    b"{'a': 1}",
+    b'{"a": 1} {"b": 2}',
+    b"",
+]
+# Records both paths must serialize to the same bytes
+RECORDS = [
+    {"context": "Fièvre à 39 °C — no rash", "question": "What temperature?", "answer_text": "39 °C", "answer_start": 9},
+    {"nested": {"list": [1, 2.5, True, None, "x"]}, "empty": {}, "tuple": (1, 2)},
+    {"score": float("nan"), "low": float("-inf"), "high": float("inf")},
+    {1: "int key", "big": 2 ** 63, "neg": -(2 ** 63)},
+    {"quote": 'she said "stop"\n\tthen left', "emoji": "\U0001f600"},
+]
+
+# === Functions ===
+
+def with_fallback(fn, *args):
+    """
+    Call `fn` with the standard-library path forced, as when orjson is not installed.
+    """
+    saved, jsonl_io.orjson = jsonl_io.orjson, None
+    try:
+        return fn(*args)
+    finally:
+        jsonl_io.orjson = saved
+
+def outcome(fn, *args):
+    """
+    ("ok", result) or ("error", built-in exception type). orjson's errors subclass
+    ValueError and TypeError like the standard library's, with different messages.
+    """
+    try:
+        return "ok", fn(*args)
+    except ValueError:
+        return "error", "ValueError"
+    except TypeError:
+        return "error", "TypeError"
+
+def compare(label, fn, value):
+    """
+    Whether orjson and the fallback agree on `fn(value)`; prints the case when they don't.
+    """
+    fast, slow = outcome(fn, value), with_fallback(outcome, fn, value)
+    same = fast == slow
+    if not same:
+        print(f"MISMATCH {label}: orjson {fast!r} / json {slow!r}")
+    return same
+
+def check_cases():
+    """
+    Compare both paths on the hand-written invalid lines and records. Returns the failure count.
+    """
+    failures = 0
+    for line in INVALID_LINES:
+        failures += not compare(f"loads({line!r})", jsonl_io.loads, line)
+        assert outcome(jsonl_io.loads, line)[0] == "error", f"loads accepted {line!r}"
+    for record in RECORDS:
+        failures += not compare(f"dumps({record!r})", jsonl_io.dumps, record)
+        failures += not compare(f"loads(dumps({record!r}))", jsonl_io.loads, jsonl_io.dumps(record))
+    return failures
+
+def check_files(data_dir):
+    """
+    Compare both paths on every line of the JSONL files under `data_dir`: parsing, and
+    re-serializing what was parsed. Returns (lines checked, failure count).
+    """
+    lines = failures = 0
+    for path in sorted(Path(data_dir).rglob("*.jsonl")):
+        with open(path, "rb") as f:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                lines += 1
+                label = f"{path}:{line_no}"
+                failures += not compare(label, jsonl_io.loads, line)
+                status, record = outcome(jsonl_io.loads, line)
+                if status == "ok":
+                    failures += not compare(f"{label} (dumps)", jsonl_io.dumps, record)
+    return lines, failures
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the json fallback in src/jsonl_io.py reads and writes exactly what orjson does.")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="JSONL files under this directory are checked too")
+    args = parser.parse_args()
+
+    if jsonl_io.orjson is None:
+        sys.exit("orjson is not installed; there is nothing to compare the fallback with")
+
+    failures = check_cases()
+    lines, file_failures = check_files(args.data_dir)
+    failures += file_failures
+    print(f"{len(INVALID_LINES) + len(RECORDS)} cases and {lines} lines from {args.data_dir}: "
+          f"{'identical' if not failures else f'{failures} mismatches'}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,147 @@
+# scripts/compare_models.py
+
+# === Imports ===
+import argparse
+import json
+import time
+import numpy as np
+from src.eval_utils import compute_scores
+from src.jsonl_io import iter_jsonl
+
+# === Configuration ===
+NUM_RESAMPLES = 10000
+CONFIDENCE = 0.95
+SEED = 42
+MAX_CHUNK_ELEMENTS = 4_000_000  # Bounds the (resamples x examples) index matrix held at once
+
+# === Functions ===
+
+def load_scores(path):
+    """
+    Read a predictions JSONL file and compute per-example EM and F1 once.
+    Returns (keys, ems, f1s) where keys identify examples by (context, question).
+    """
+    keys, predictions, references = [], [], []
+    for row in iter_jsonl(path):
+        keys.append((row["context"], row["question"]))
+        predictions.append(row["prediction"])
+        references.append(row["reference"])
+    ems, f1s = compute_scores(predictions, references)
+    return keys, np.asarray(ems, dtype=np.float64), np.asarray(f1s, dtype=np.float64)
+
+def align(all_keys):
+    """
+    Index arrays selecting the examples present in every file, in the first file's order.
+    Files scored on the same eval set align trivially.
+    """
+    if all(keys == all_keys[0] for keys in all_keys):
+        return [np.arange(len(all_keys[0]), dtype=np.intp)] * len(all_keys)
+    positions = [{key: i for i, key in enumerate(keys)} for keys in all_keys]
+    shared = [key for key in all_keys[0] if all(key in p for p in positions)]
+    print(f"Files differ; comparing the {len(shared)} examples they share")
+    return [np.array([p[key] for key in shared], dtype=np.intp) for p in positions]
+
+def bootstrap_means(scores, num_resamples, rng):
+    """
+    Means of `scores` (models x examples) over paired bootstrap resamples: every model
+    is scored on the same resampled examples. Returns an array of shape (models, resamples).
+    """
+    n = scores.shape[1]
+    chunk = max(1, MAX_CHUNK_ELEMENTS // n)
+    means = []
+    for start in range(0, num_resamples, chunk):
+        idx = rng.integers(0, n, size=(min(chunk, num_resamples - start), n))
+        means.append(scores[:, idx].mean(axis=2))
+    return np.concatenate(means, axis=1)
+
+def paired_permutation_pvalue(differences, num_resamples, rng):
+    """
+    Two-sided p-value of a paired sign-flip permutation test on per-example differences.
+    """
+    n = len(differences)
+    observed = abs(differences.mean())
+    chunk = max(1, MAX_CHUNK_ELEMENTS // n)
+    extreme = 0
+    for start in range(0, num_resamples, chunk):
+        signs = rng.choice(np.array([-1.0, 1.0]), size=(min(chunk, num_resamples - start), n))
+        extreme += int((np.abs((signs * differences).mean(axis=1)) >= observed - 1e-12).sum())
+    return (extreme + 1) / (num_resamples + 1)
+
+def confidence_interval(samples, confidence):
+    """
+    Percentile interval of bootstrap samples, in percent.
+    """
+    tail = 100 * (1 - confidence) / 2
+    low, high = np.percentile(samples, [tail, 100 - tail], axis=-1)
+    return 100 * low, 100 * high
+
+def compare(paths, num_resamples, confidence, seed):
+    """
+    Headline metrics with bootstrap CIs for every file, and paired tests of each file
+    against the first one (the baseline).
+    """
+    loaded = [load_scores(path) for path in paths]
+    indices = align([keys for keys, _, _ in loaded])
+    if len(indices[0]) == 0:
+        raise ValueError("The predictions files share no examples (matched by context and question)")
+    ems = np.stack([em[idx] for (_, em, _), idx in zip(loaded, indices)])
+    f1s = np.stack([f1[idx] for (_, _, f1), idx in zip(loaded, indices)])
+
+    rng = np.random.default_rng(seed)
+    em_samples = bootstrap_means(ems, num_resamples, rng)
+    f1_samples = bootstrap_means(f1s, num_resamples, np.random.default_rng(seed))  # Same resamples as EM
+
+    report = {"num_examples": int(ems.shape[1]), "num_resamples": num_resamples, "confidence": confidence, "models": []}
+    for i, path in enumerate(paths):
+        entry = {"path": path}
+        for name, scores, samples in [("exact_match", ems, em_samples), ("f1_score", f1s, f1_samples)]:
+            low, high = confidence_interval(samples[i], confidence)
+            entry[name] = {"value": round(100 * scores[i].mean(), 2), "ci": [round(low, 2), round(high, 2)]}
+            if i > 0:
+                low, high = confidence_interval(samples[i] - samples[0], confidence)
+                entry[name]["delta_vs_baseline"] = round(100 * (scores[i].mean() - scores[0].mean()), 2)
+                entry[name]["delta_ci"] = [round(low, 2), round(high, 2)]
+                entry[name]["p_value"] = round(paired_permutation_pvalue(scores[i] - scores[0], num_resamples, rng), 4)
+        report["models"].append(entry)
+    return report
+
+def print_report(report):
+    """
+    Print headline metrics with CIs, and deltas with p-values against the baseline.
+    """
+    pct = int(100 * report["confidence"])
+    print(f"{report['num_examples']} examples, {report['num_resamples']} resamples, {pct}% CIs\n")
+    for i, entry in enumerate(report["models"]):
+        print(entry["path"] + (" (baseline)" if i == 0 else ""))
+        for name, label in [("exact_match", "EM"), ("f1_score", "F1")]:
+            metric = entry[name]
+            line = f"  {label}: {metric['value']:6.2f} [{metric['ci'][0]:6.2f}, {metric['ci'][1]:6.2f}]"
+            if "delta_vs_baseline" in metric:
+                line += (f" | delta: {metric['delta_vs_baseline']:+6.2f}"
+                         f" [{metric['delta_ci'][0]:+6.2f}, {metric['delta_ci'][1]:+6.2f}]"
+                         f" | p = {metric['p_value']:.4f}")
+            print(line)
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare predictions files with bootstrap CIs and paired permutation tests.")
+    parser.add_argument("paths", nargs="+", help="Predictions JSONL files; the first one is the baseline")
+    parser.add_argument("--resamples", type=int, default=NUM_RESAMPLES)
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", default=None, help="Optional path to save the report as JSON")
+    args = parser.parse_args()
+    if len(args.paths) < 2:
+        parser.error("Provide at least two predictions files")
+
+    t0 = time.perf_counter()
+    try:
+        report = compare(args.paths, args.resamples, args.confidence, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    print_report(report)
+    print(f"\nComputed in {time.perf_counter() - t0:.2f}s")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved comparison to: {args.output}")
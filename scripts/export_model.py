@@ -0,0 +1,27 @@
+# scripts/export_model.py
+
+# === Imports ===
+import argparse
+import os
+from deploy.app.model_loader import (
+    MODEL_PATH, ONNX_FILENAME, TORCHSCRIPT_FILENAME, export_onnx, export_quantized, export_torchscript
+)
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a trained QA checkpoint for the onnx, torchscript or int8 serving mode.")
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument("--format", choices=["onnx", "torchscript", "int8"], default="onnx")
+    parser.add_argument("--output", default=None, help="Defaults to the file the serving backend loads from --model-path"
+                                                             " (int8 is always saved next to the checkpoint)")
+    args = parser.parse_args()
+
+    if args.format == "onnx":
+        output = args.output or os.path.join(args.model_path, ONNX_FILENAME)
+        export_onnx(args.model_path, output)
+    elif args.format == "torchscript":
+        output = args.output or os.path.join(args.model_path, TORCHSCRIPT_FILENAME)
+        export_torchscript(args.model_path, output)
+    else:
+        output = export_quantized(args.model_path)
+    print(f"Exported {args.format} model to: {output}")
@@ -1,15 +1,19 @@
 # scripts/extract_radiology_samples.py
 
 # === Imports ===
+import re
+import numpy as np
 import pandas as pd
-import json
 from pathlib import Path
+from src.jsonl_io import write_jsonl
 
 # === Configuration ===
 CSV_PATH = Path("data/raw/radiology/mimic_cxr_reports_parsed.csv")
 OUTPUT_PATH = Path("data/raw/radiology/radiology_sampled_400.jsonl")
 NUM_SAMPLES = 400  # Adjust to extract 300–500 reports
 RANDOM_SEED = 42
+MIN_REPORT_LENGTH = 300
+CHUNK_SIZE = 100_000  # Rows read at a time; memory stays bounded by this plus the sample
 
 # === Keywords to identify informative reports ===
 CLINICAL_KEYWORDS = [
@@ -18,38 +22,71 @@ CLINICAL_KEYWORDS = [
     "airspace", "collapse", "interstitial", "fibrosis", "nodule", "infection"
 ]
 
+# One case-insensitive alternation, so each report is scanned once in C
+INFORMATIVE_PATTERN = re.compile("|".join(map(re.escape, ["impression"] + CLINICAL_KEYWORDS)), re.IGNORECASE)
+
 # === Functions ===
-def is_informative(report):
-    """Return True if the report is informative based on length and keywords."""
-    if not isinstance(report, str) or len(report) < 300:
-        return False
-    report_lower = report.lower()
-    return "impression" in report_lower or any(kw in report_lower for kw in CLINICAL_KEYWORDS)
+def informative_mask(reports):
+    """
+    Boolean mask of reports that are long enough and mention the impression or a clinical keyword.
+    A chunk whose reports are all missing is read as float, so cast to str first; missing
+    reports become empty and never pass.
+    """
+    reports = reports.fillna("").astype(str)
+    is_long = reports.str.len().ge(MIN_REPORT_LENGTH)
+    mentions = reports.str.contains(INFORMATIVE_PATTERN)
+    return is_long & mentions
 
-# === Main Logic ===
+def sample_keys(row_index, seed):
+    """
+    Deterministic pseudo-random key per global row index (splitmix64 of seed and index).
+    Keeping the rows with the smallest keys is a uniform sample that depends only on the
+    seed and the file, not on how it is chunked.
+    """
+    with np.errstate(over="ignore"):
+        z = np.asarray(row_index, dtype=np.uint64) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
 
-# Load CSV data
-df = pd.read_csv(CSV_PATH)
+def extract_samples(csv_path, num_samples, seed, chunk_size=CHUNK_SIZE):
+    """
+    Stream the CSV in chunks, filter informative reports with vectorized masks and keep a
+    bottom-k sample by hashed row key in one pass. Returns (sample, informative count);
+    the sample is ordered by key, so it reads in random but reproducible order.
+    """
+    sample = None
+    informative = 0
+    offset = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+        mask = informative_mask(chunk["report"]).to_numpy()
+        kept = chunk.loc[mask].copy()
+        kept["_key"] = sample_keys(np.arange(offset, offset + len(chunk))[mask], seed)
+        informative += len(kept)
+        offset += len(chunk)
 
-# Filter for informative reports
-filtered = df[df["report"].apply(is_informative)].copy()
-print(f"Found {len(filtered)} informative reports")
+        candidates = kept if sample is None else pd.concat([sample, kept], ignore_index=True)
+        sample = candidates.nsmallest(num_samples, "_key") if len(candidates) > num_samples else candidates
 
-# Sample N unique reports
-sample_size = min(NUM_SAMPLES, len(filtered))
-sampled = filtered.sample(sample_size, random_state=RANDOM_SEED)
+    if sample is None:
+        return pd.DataFrame(columns=["subject_id", "study_id", "report"]), 0
+    return sample.sort_values("_key").drop(columns="_key"), informative
 
-# Ensure output directory exists
-OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+def to_records(sample):
+    """
+    JSONL records with the subject and study ids (None when missing) and the report text.
+    """
+    out = pd.DataFrame({
+        column: sample[column] if column in sample else None for column in ("subject_id", "study_id", "report")
+    })
+    out = out.astype(object).where(out.notna(), None)
+    return out.to_dict("records")
 
-# Save sampled reports to JSONL
-with open(OUTPUT_PATH, "w") as f:
-    for _, row in sampled.iterrows():
-        record = {
-            "subject_id": row.get("subject_id", None),
-            "study_id": row.get("study_id", None),
-            "report": row["report"]
-        }
-        f.write(json.dumps(record) + "\n")
+# === Main Logic ===
+if __name__ == "__main__":
+    sampled, num_informative = extract_samples(CSV_PATH, NUM_SAMPLES, RANDOM_SEED)
+    print(f"Found {num_informative} informative reports")
 
-print(f"Saved {sample_size} radiology reports to {OUTPUT_PATH}")
\ No newline at end of file
+    # Save sampled reports to JSONL
+    count = write_jsonl(OUTPUT_PATH, to_records(sampled))
+    print(f"Saved {count} radiology reports to {OUTPUT_PATH}")
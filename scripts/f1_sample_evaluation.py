@@ -1,7 +1,7 @@
 # scripts/f1_sample_evaluation.py
 
 # === Imports ===
-import json
+from src.jsonl_io import iter_jsonl
 
 # === Functions ===
 def compute_em_f1(samples):
@@ -27,13 +27,9 @@ def compute_em_f1(samples):
 
 # === Main Logic ===
 
-# Load predictions from file
-with open("results/synthea_predictions.jsonl") as f:
-    preds = [json.loads(line) for line in f]
-
-# Filter entries where the reference contains brackets (e.g., medications)
+# Stream predictions, keeping entries where the reference contains brackets (e.g., medications)
 bracketed_preds = [
-    p for p in preds
+    p for p in iter_jsonl("results/synthea_predictions.jsonl")
     if "[" in p["reference"] and "]" in p["reference"]
 ]
 
@@ -1,18 +1,22 @@
 # scripts/generate_qa_samples.py
 
 # === Imports ===
+import argparse
+import asyncio
 import os
-import json
 import random
 from pathlib import Path
 from dotenv import load_dotenv
-import anthropic
+from src.jsonl_io import iter_jsonl
+from src.qa_generation import StubClient, generate_dataset
 
 # === Configuration ===
 INPUT_PATH = Path("data/raw/mimic/discharge_notes_200.jsonl")
 OUTPUT_PATH = Path("data/generated_qa_examples_200_0152bwixwixquixqubixuoqwibxuqwwdqhiwudh.jsonl")
 NUM_SAMPLES = 100
 MODEL_NAME = "claude-3-sonnet-20240229"
+CACHE_DIR = Path("data/cache/qa_generation")
+SEED = 42  # Fixed so a resumed run samples the same notes
 
 SYSTEM_PROMPT = """You are a medical QA dataset generator. Your job is to create training examples for extractive question answering from a clinical discharge summary.
 
@@ -37,47 +41,64 @@ Rules:
 
 Only output the JSON list. Do not include explanations or formatting outside the JSON."""
 
-# === Load API Key and Initialize Client ===
-load_dotenv()
-api_key = os.getenv("ANTHROPIC_API_KEY")
-client = anthropic.Anthropic(
-    api_key=os.getenv("ANTHROPIC_API_KEY")
-)
+# === Functions ===
+def reservoir_sample(records, k):
+    """
+    Uniformly sample k records from a stream while holding only k of them in memory.
+    """
+    sample = []
+    for i, record in enumerate(records):
+        if i < k:
+            sample.append(record)
+        else:
+            j = random.randint(0, i)
+            if j < k:
+                sample[j] = record
+    random.shuffle(sample)
+    return sample
 
-# === Load Notes ===
-with open(INPUT_PATH, "r") as f:
-    notes = [json.loads(line) for line in f]
+def make_records(sample, text, qa_pairs):
+    """
+    Attach note identifiers and the note text to each generated QA pair.
+    """
+    return [
+        {"subject_id": sample["subject_id"], "hadm_id": sample["hadm_id"], "context": text, **qa}
+        for qa in qa_pairs
+    ]
 
-# === Sample Notes ===
-samples = random.sample(notes, NUM_SAMPLES)
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate extractive QA pairs from MIMIC discharge notes.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight")
+    parser.add_argument("--rpm", type=float, default=50, help="Requests per minute allowed by the API tier")
+    parser.add_argument("--dry-run", action="store_true", help="Use the local stub client instead of the API")
+    args = parser.parse_args()
 
-# === Generate QA Pairs and Write to Output ===
-with open(OUTPUT_PATH, "a") as f:
-    for i, sample in enumerate(samples):
-        text = sample["text"].strip()
-        print(f"\nNote {i+1}/{NUM_SAMPLES} — HADM_ID: {sample['hadm_id']}")
+    # === Load API Key and Initialize Client ===
+    output_path, cache_dir = OUTPUT_PATH, CACHE_DIR
+    if args.dry_run:
+        # Stub answers go to a separate file and are never cached
+        client = StubClient()
+        output_path, cache_dir = OUTPUT_PATH.with_suffix(".dry_run.jsonl"), None
+    else:
+        import anthropic
+        load_dotenv()
+        client = anthropic.AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
 
-        response = client.messages.create(
-            model=MODEL_NAME,
-            max_tokens=512,
-            temperature=0.3,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT}
-            ]
-        )
+    # === Sample Notes ===
+    random.seed(SEED)
+    samples = reservoir_sample(iter_jsonl(INPUT_PATH), NUM_SAMPLES)
 
-        try:
-            qa_pairs = json.loads(response.choices[0].message.content)
-            for qa in qa_pairs:
-                item = {
-                    "subject_id": sample["subject_id"],
-                    "hadm_id": sample["hadm_id"],
-                    "context": text,
-                    **qa
-                }
-                f.write(json.dumps(item) + "\n")
-        except Exception as e:
-            print("JSON decode failed:", e)
-            continue
-
-print(f"\nSaved QA examples to {OUTPUT_PATH}")
\ No newline at end of file
+    # === Generate QA Pairs and Write to Output ===
+    stats = asyncio.run(generate_dataset(
+        samples, client, output_path,
+        note_text=lambda sample: sample["text"].strip(),
+        make_records=make_records,
+        model=MODEL_NAME,
+        system_prompt=SYSTEM_PROMPT,
+        concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        cache_dir=cache_dir,
+    ))
+    print(f"\n{stats}")
+    print(f"Saved QA examples to {output_path}")
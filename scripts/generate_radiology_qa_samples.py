@@ -1,16 +1,19 @@
 # scripts/generate_radiology_qa_samples.py
 
 # === Imports ===
+import argparse
+import asyncio
 import os
-import json
 from pathlib import Path
 from dotenv import load_dotenv
-import anthropic
+from src.jsonl_io import iter_jsonl
+from src.qa_generation import StubClient, generate_dataset
 
 # === Configuration ===
 INPUT_PATH = Path("data/raw/radiology/radiology_sampled_400.jsonl")
 OUTPUT_PATH = Path("data/raw/radiology/generated_radiology_qa_400.jsonl")
 MODEL_NAME = "claude-3-sonnet-20240229"
+CACHE_DIR = Path("data/cache/qa_generation")
 
 SYSTEM_PROMPT = """You are a dataset generator for radiology question answering.
 
@@ -35,45 +38,46 @@ Rules:
 - Only output the raw JSON list — no prose, headers, or explanations.
 """
 
-# === Load API Key and Initialize Client ===
-load_dotenv()
-api_key = os.getenv("ANTHROPIC_API_KEY")
-client = anthropic.Anthropic(
-    api_key=os.getenv("ANTHROPIC_API_KEY")
-)
+# === Functions ===
+def make_records(sample, text, qa_pairs):
+    """
+    Attach report identifiers and the report text to each generated QA pair.
+    """
+    return [
+        {"subject_id": sample.get("subject_id", ""), "hadm_id": sample.get("study_id", ""), "context": text, **qa}
+        for qa in qa_pairs
+    ]
 
-# === Load Radiology Reports ===
-with open(INPUT_PATH, "r") as f:
-    notes = [json.loads(line) for line in f]
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate extractive QA pairs from radiology reports.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight")
+    parser.add_argument("--rpm", type=float, default=50, help="Requests per minute allowed by the API tier")
+    parser.add_argument("--dry-run", action="store_true", help="Use the local stub client instead of the API")
+    args = parser.parse_args()
 
-# === Generate QA Pairs and Write to Output ===
-with open(OUTPUT_PATH, "a") as f_out:
-    for i, sample in enumerate(notes):
-        text = sample["report"].strip()
-        print(f"\nRadiology Report {i+1}/{len(notes)}")
+    # === Load API Key and Initialize Client ===
+    output_path, cache_dir = OUTPUT_PATH, CACHE_DIR
+    if args.dry_run:
+        # Stub answers go to a separate file and are never cached
+        client = StubClient()
+        output_path, cache_dir = OUTPUT_PATH.with_suffix(".dry_run.jsonl"), None
+    else:
+        import anthropic
+        load_dotenv()
+        client = anthropic.AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
 
-        try:
-            response = client.messages.create(
-                model=MODEL_NAME,
-                max_tokens=512,
-                temperature=0.3,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT}
-                ]
-            )
-
-            qa_pairs = json.loads(response.choices[0].message.content)
-            for qa in qa_pairs:
-                item = {
-                    "subject_id": sample.get("subject_id", ""),
-                    "hadm_id": sample.get("study_id", ""),
-                    "context": text,
-                    **qa
-                }
-                f_out.write(json.dumps(item) + "\n")
-
-        except Exception as e:
-            print(f"Error for study_id={sample.get('study_id')}: {e}")
-            continue
-
-print(f"\nSaved radiology QA examples to {OUTPUT_PATH}")
\ No newline at end of file
+    # === Generate QA Pairs and Write to Output ===
+    # Reports are streamed; ones already in the output's checkpoint are skipped
+    stats = asyncio.run(generate_dataset(
+        iter_jsonl(INPUT_PATH), client, output_path,
+        note_text=lambda sample: sample["report"].strip(),
+        make_records=make_records,
+        model=MODEL_NAME,
+        system_prompt=SYSTEM_PROMPT,
+        concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        cache_dir=cache_dir,
+    ))
+    print(f"\n{stats}")
+    print(f"Saved radiology QA examples to {output_path}")
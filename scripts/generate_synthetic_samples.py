@@ -1,10 +1,10 @@
 # scripts/generate_synthetic_samples.py
 
 # === Imports ===
-import json
 import random
 import uuid
 from pathlib import Path
+from src.jsonl_io import write_jsonl
 
 # === Configuration and Vocabularies ===
 # These vocabularies can be expanded or modified as needed.
@@ -45,11 +45,7 @@ def main(n_samples=120):
     """
     Generate and save synthetic QA samples to a JSONL file.
     """
-    samples = [generate_sample() for _ in range(n_samples)]
-    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT_PATH, "w") as f:
-        for sample in samples:
-            f.write(json.dumps(sample) + "\n")
+    write_jsonl(OUTPUT_PATH, (generate_sample() for _ in range(n_samples)))
     print(f"Saved {n_samples} samples to {OUTPUT_PATH}")
 
 # === Main Logic ===
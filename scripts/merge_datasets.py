@@ -1,24 +1,26 @@
 # scripts/merge_datasets.py
 
 # === Imports ===
-import torch
-from pathlib import Path
-from datasets import concatenate_datasets
+from datasets import concatenate_datasets, load_from_disk
+from src.config import load_config
+from src.data_utils import save_tokenized_dataset
 
 # === Configuration: Dataset Paths ===
-SYNTHETIC_PATH = Path("data/processed/synthea_train_dataset.pt")
-MIMIC_PATH = Path("data/processed/mimic_train_dataset_v2.pt")
-OUTPUT_PATH = Path("data/processed/combined_train_dataset_v2.pt")
+# Inputs are the Arrow directories written by scripts/preprocess.py
+config = load_config("configs/train_config.yaml")
+SYNTHETIC_PATH = config["processed_paths"]["synthea"]
+MIMIC_PATH = config["processed_paths"]["mimic_2"]
+OUTPUT_PATH = config["data_path_new"]
 
 # === Main Logic ===
 
-# Load datasets from disk
-synthea_ds = torch.load(SYNTHETIC_PATH, weights_only=False)
-mimic_ds = torch.load(MIMIC_PATH, weights_only=False)
+# Memory-map datasets from disk; rows are only read while writing the merged copy
+synthea_ds = load_from_disk(SYNTHETIC_PATH)
+mimic_ds = load_from_disk(MIMIC_PATH)
 
 # Merge datasets using Hugging Face utility
 combined_ds = concatenate_datasets([synthea_ds, mimic_ds])
 
 # Save the combined dataset
-torch.save(combined_ds, OUTPUT_PATH)
-print(f"Combined dataset saved to: {OUTPUT_PATH}")
\ No newline at end of file
+save_tokenized_dataset(combined_ds, OUTPUT_PATH)
+print(f"Combined dataset: {len(combined_ds)} features")
@@ -1,8 +1,12 @@
 # scripts/merge_jsonl.py
 
 # === Imports ===
-from pathlib import Path
+import argparse
 import json
+import time
+from pathlib import Path
+from src.jsonl_io import JsonlWriter, iter_jsonl
+from src.near_dedup import THRESHOLD, NearDuplicateIndex, answer_key, context_key, question_shingles
 
 # === Configuration: Input and Output Paths ===
 INPUT_PATHS = [
@@ -10,33 +14,83 @@ INPUT_PATHS = [
     Path("data/raw/mimic/merged_generated_qa.jsonl")
 ]
 OUTPUT_PATH = Path("data/raw/mimic/merged_generated_qa_v2.jsonl")
+REPORT_PATH = Path("data/raw/mimic/merged_generated_qa_v2_near_duplicates.json")
 
 # === Functions ===
-def merge_unique_qa_entries(input_paths, output_path):
+def iter_unique_qa_entries(input_paths):
     """
-    Merge multiple JSONL files, keeping only unique (hadm_id, question) pairs.
+    Stream entries from multiple JSONL files, keeping only unique (hadm_id, question) pairs.
+    Only the dedup keys are kept in memory.
     """
     seen = set()
-    unique_entries = []
-
     for path in input_paths:
-        with open(path, "r") as fin:
-            for line in fin:
-                try:
-                    obj = json.loads(line)
-                    key = (obj["hadm_id"], obj["question"])
-                    if key not in seen:
-                        seen.add(key)
-                        unique_entries.append(obj)
-                except Exception as e:
-                    print(f"Skipping line in {path.name}: {e}")
-
-    with open(output_path, "w") as fout:
-        for item in unique_entries:
-            fout.write(json.dumps(item) + "\n")
-
-    print(f"Merged {len(unique_entries)} unique QA entries into {output_path}")
+        for obj in iter_jsonl(path, schema={"hadm_id": object, "question": str}, skip_invalid=True):
+            key = (obj["hadm_id"], obj["question"])
+            if key not in seen:
+                seen.add(key)
+                yield obj
+
+def find_near_duplicates(input_paths, threshold):
+    """
+    First pass: index every exact-unique entry's question by (context, answer) and return
+    the LSH index.
+    """
+    index = NearDuplicateIndex(threshold=threshold)
+    for obj in iter_unique_qa_entries(input_paths):
+        group = (context_key(obj.get("context", "")), answer_key(str(obj.get("answer_text", ""))))
+        index.add(group, question_shingles(obj["question"]))
+    return index
+
+def merge_unique_qa_entries(input_paths, output_path, threshold=THRESHOLD, report_path=None):
+    """
+    Merge multiple JSONL files, keeping only unique (hadm_id, question) pairs and dropping
+    paraphrased questions about the same answer within a context (MinHash/LSH over the
+    questions' content words, Jaccard >= `threshold`). The first entry of each cluster is kept.
+    With `threshold` None, only exact duplicates are removed.
+    """
+    t0 = time.perf_counter()
+    index = find_near_duplicates(input_paths, threshold) if threshold is not None else None
+    clusters = index.duplicate_clusters() if index is not None else []
+    removed = {idx for cluster in clusters for idx in cluster[1:]}
+    members = {idx for cluster in clusters for idx in cluster}
+
+    # Second pass: stream entries again, writing the kept ones and noting cluster members
+    questions = {}
+    with JsonlWriter(output_path) as writer:
+        for idx, obj in enumerate(iter_unique_qa_entries(input_paths)):
+            if idx in members:
+                questions[idx] = {"hadm_id": obj["hadm_id"], "question": obj["question"], "answer_text": obj.get("answer_text")}
+            if idx not in removed:
+                writer.write(obj)
+
+    if index is not None:
+        print(f"Near-duplicates: {len(removed)} entries in {len(clusters)} clusters removed at Jaccard >= {threshold}"
+              f" ({index.candidate_pairs} candidate pairs checked, {time.perf_counter() - t0:.2f}s)")
+        if report_path:
+            report = {
+                "threshold": threshold,
+                "removed": len(removed),
+                "clusters": [
+                    {"kept": questions[cluster[0]], "removed": [questions[idx] for idx in cluster[1:]]}
+                    for cluster in clusters
+                ],
+            }
+            Path(report_path).parent.mkdir(parents=True, exist_ok=True)
+            with open(report_path, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"Saved near-duplicate report to {report_path}")
+
+    print(f"Merged {writer.count} unique QA entries into {output_path}")
 
 # === Main Logic ===
 if __name__ == "__main__":
-    merge_unique_qa_entries(INPUT_PATHS, OUTPUT_PATH)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Merge generated QA files, removing exact and near-duplicate questions.")
+    parser.add_argument("--inputs", nargs="+", type=Path, default=INPUT_PATHS)
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="Jaccard similarity at which two questions about one context are duplicates")
+    parser.add_argument("--exact-only", action="store_true", help="Skip near-duplicate detection")
+    parser.add_argument("--report", type=Path, default=REPORT_PATH)
+    args = parser.parse_args()
+
+    merge_unique_qa_entries(args.inputs, args.output, None if args.exact_only else args.threshold, args.report)
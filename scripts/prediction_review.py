@@ -1,8 +1,8 @@
 # scripts/prediction_review.py
 
 # === Imports ===
-import json
-from src.eval_utils import f1_score, exact_match_score
+from src.eval_utils import compute_scores
+from src.jsonl_io import read_jsonl
 from transformers import AutoTokenizer
 
 # === Configuration ===
@@ -15,19 +15,17 @@ def load_predictions(path):
     """
     Load prediction examples from a JSONL file.
     """
-    with open(path) as f:
-        return [json.loads(line) for line in f]
+    return read_jsonl(path)
 
 def collect_bad_predictions(examples, f1_threshold=0.9):
     """
     Collect predictions with low F1 or non-exact matches.
     """
     bad_preds = []
-    for ex in examples:
+    ems, f1s = compute_scores([ex["prediction"] for ex in examples], [ex["reference"] for ex in examples])
+    for ex, em, f1 in zip(examples, ems, f1s):
         pred = ex["prediction"]
         ref = ex["reference"]
-        f1 = f1_score(pred, ref)
-        em = exact_match_score(pred, ref)
         if em == 0 or f1 < f1_threshold:
             bad_preds.append({
                 "f1": f1,
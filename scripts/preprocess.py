@@ -1,82 +1,38 @@
 # scripts/preprocess.py
 
 # === Imports ===
-import json
-import torch
-import yaml
-from pathlib import Path
+import argparse
+import os
 from transformers import AutoTokenizer
-from datasets import Dataset
-from src.data_utils import prepare_train_features
+from src.config import load_config
+from src.data_utils import preprocess_dataset
 
-# === Configuration: Load YAML Config ===
-with open("configs/train_config.yaml") as f:
-    config = yaml.safe_load(f)
-
-MODEL_NAME = config["model_name"]
-DATA_PATH = config["data_path_synthea"]
-MAX_LENGTH = config["max_length"]
-DOC_STRIDE = config["doc_stride"]
-
-SAVE_PATH = Path("data/processed/synthea_train_dataset.pt")
-
-# === Initialize Tokenizer ===
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+# === Configuration ===
+CONFIG_PATH = "configs/train_config.yaml"
 
 # === Functions ===
 
-def squeeze_batch_dims(example):
-    """
-    Squeeze batch dimension for tensor fields if present.
-    """
-    for k in ["input_ids", "token_type_ids", "attention_mask", "start_positions", "end_positions"]:
-        example[k] = torch.tensor(example[k])
-        if example[k].dim() == 2:
-            example[k] = example[k].squeeze(0)
-    return example
-
-def normalize_dtype(example):
+def main():
     """
-    Normalize data types for all fields to ensure consistency.
+    Tokenize one or more datasets listed under `processed_paths` in the training config.
     """
-    return {
-        "input_ids": [int(x) for x in example["input_ids"]],
-        "token_type_ids": [int(x) for x in example["token_type_ids"]],
-        "attention_mask": [int(x) for x in example["attention_mask"]],
-        "start_positions": int(example["start_positions"]),
-        "end_positions": int(example["end_positions"]),
-    }
+    config = load_config(CONFIG_PATH)
+    parser = argparse.ArgumentParser(description="Tokenize raw QA JSONL into training features.")
+    parser.add_argument("--dataset", nargs="+", required=True, choices=sorted(config["processed_paths"]),
+                        help="Dataset name(s): data_path_<name> is read and processed_paths[<name>] written")
+    parser.add_argument("--num-proc", type=int, default=config.get("preprocess_num_proc") or os.cpu_count(),
+                        help="Tokenization processes")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the saved dataset is up to date")
+    args = parser.parse_args()
+
+    # Each map process tokenizes on one thread instead of oversubscribing the CPU
+    if args.num_proc > 1:
+        os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+    tokenizer = AutoTokenizer.from_pretrained(config["model_name"], use_fast=True)
+    for name in args.dataset:
+        preprocess_dataset(name, config, tokenizer, num_proc=args.num_proc, force=args.force)
 
 # === Main Logic ===
-
-# Load JSONL QA samples
-with open(DATA_PATH, "r") as f:
-    data = [json.loads(line) for line in f]
-
-# Wrap as Hugging Face Dataset
-raw_dataset = Dataset.from_list(data)
-
-# Tokenize and align answer spans
-tokenized_dataset = raw_dataset.map(
-    lambda x: prepare_train_features(x, tokenizer, config),
-    batched=True,
-    remove_columns=raw_dataset.column_names
-)
-
-# Check shape and type sanity before saving
-sample = tokenized_dataset[0]
-for k, v in sample.items():
-    if isinstance(v, torch.Tensor):
-        print(f"{k}: {v.shape} ({v.dtype})")
-    else:
-        print(f"{k}: type={type(v)}")
-
-# Normalize and squeeze batch dimensions
-tokenized_dataset = tokenized_dataset.map(normalize_dtype)
-tokenized_dataset = tokenized_dataset.map(squeeze_batch_dims)
-tokenized_dataset.set_format("torch")
-
-# Ensure output directory exists and save dataset
-SAVE_PATH.parent.mkdir(parents=True, exist_ok=True)
-torch.save(tokenized_dataset, SAVE_PATH)
-print(f"Saved tokenized dataset to: {SAVE_PATH}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
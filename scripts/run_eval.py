@@ -0,0 +1,22 @@
+# scripts/run_eval.py
+
+# === Imports ===
+import argparse
+import os
+from src.config import load_config
+from src.eval_engine import run_evaluations
+
+# === Configuration ===
+CONFIG_PATH = "configs/eval_config.yaml"
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate checkpoints on eval sets as configured in eval_config.yaml.")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--runs", nargs="+", default=None, help="Run names from the config (default: all)")
+    parser.add_argument("--quantized", action="store_true", default=os.getenv("QA_QUANTIZE", "0") == "1",
+                        help="Evaluate the int8 artifacts (also enabled by QA_QUANTIZE=1)")
+    parser.add_argument("--num-workers", type=int, default=None,
+                        help="Processes to shard each run across (default: num_workers from the config)")
+    args = parser.parse_args()
+    run_evaluations(load_config(args.config), args.runs, quantized=args.quantized, num_workers=args.num_workers)
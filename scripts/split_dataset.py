@@ -1,40 +1,138 @@
 # scripts/split_dataset.py
 
 # === Imports ===
-import json
-import random
+import argparse
+import hashlib
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+from src.config import load_config
+from src.jsonl_io import JsonlWriter, iter_jsonl
 
 # === Configuration ===
+CONFIG_PATH = "configs/train_config.yaml"
 DATA_PATH = "data/processed/synthea_qa.jsonl"
 TRAIN_PATH = "data/processed/synthea_train.jsonl"
 VAL_PATH = "data/processed/synthea_val.jsonl"
+FOLDS_DIR = "data/processed/folds"
 TRAIN_SPLIT = 0.9
 SEED = 42
+# Records sharing one of these ids come from the same note or study and stay together;
+# radiology generation stores the study id under `hadm_id`. Without one, the context is the group
+GROUP_FIELDS = ("hadm_id", "study_id")
 
-# === Main Logic ===
+# === Functions ===
+
+def group_key(record):
+    """
+    Key of the note a record was generated from: its `hadm_id`/`study_id`, or a hash of
+    its context when it has neither.
+    """
+    for field in GROUP_FIELDS:
+        value = record.get(field)
+        if value not in (None, ""):
+            return f"{field}:{value}"
+    context = record.get("context") or ""
+    return "context:" + hashlib.sha1(context.encode("utf-8")).hexdigest()
+
+def group_position(key, seed):
+    """
+    Stable pseudo-random position of a group in [0, 1). It depends only on the key and
+    the seed, so a group lands in the same split on every run, whatever the file order.
+    """
+    digest = hashlib.sha256(f"{seed}:{key}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
 
-# Set random seed for reproducibility
-random.seed(SEED)
+def assign_split(record, train_split, seed):
+    """
+    "train" or "val" for a record, by its group's position.
+    """
+    return "train" if group_position(group_key(record), seed) < train_split else "val"
 
-# Load all examples from the JSONL file
-with open(DATA_PATH, "r") as f:
-    lines = [json.loads(l) for l in f]
+def assign_fold(record, folds, seed):
+    """
+    Fold (0..folds-1) whose validation set holds the record's group.
+    """
+    return int(group_position(group_key(record), seed) * folds)
 
-# Shuffle and split the dataset
-random.shuffle(lines)
-split_idx = int(TRAIN_SPLIT * len(lines))
-train = lines[:split_idx]
-val = lines[split_idx:]
+def split_files(sources, train_path, val_path, train_split=TRAIN_SPLIT, seed=SEED):
+    """
+    Stream each source JSONL (name -> path) into one train and one val file. Returns
+    record counts per (source, split).
+    """
+    counts = Counter()
+    with JsonlWriter(train_path) as train, JsonlWriter(val_path) as val:
+        writers = {"train": train, "val": val}
+        for name, path in sources.items():
+            for record in iter_jsonl(path):
+                split = assign_split(record, train_split, seed)
+                writers[split].write(record)
+                counts[name, split] += 1
+    return counts
 
-# Save the training set
-with open(TRAIN_PATH, "w") as f:
-    for ex in train:
-        f.write(json.dumps(ex) + "\n")
+def split_folds(sources, output_dir, folds, seed=SEED):
+    """
+    Stream each source JSONL into `folds` train/val pairs under `output_dir/fold_<i>/`.
+    A record is written to the val file of its fold and the train files of all the others.
+    Returns record counts per (source, fold).
+    """
+    counts = Counter()
+    output_dir = Path(output_dir)
+    with ExitStack() as stack:
+        writers = [
+            {split: stack.enter_context(JsonlWriter(output_dir / f"fold_{i}" / f"{split}.jsonl")) for split in ("train", "val")}
+            for i in range(folds)
+        ]
+        for name, path in sources.items():
+            for record in iter_jsonl(path):
+                fold = assign_fold(record, folds, seed)
+                for i, fold_writers in enumerate(writers):
+                    fold_writers["val" if i == fold else "train"].write(record)
+                counts[name, fold] += 1
+    return counts
 
-# Save the validation set
-with open(VAL_PATH, "w") as f:
-    for ex in val:
-        f.write(json.dumps(ex) + "\n")
+def print_report(counts, columns):
+    """
+    Record counts per source and column (split or fold), with each column's share.
+    """
+    names = list(dict.fromkeys(name for name, _ in counts))
+    width = max(len(name) for name in names + ["total"])
+    print(f"{'source':<{width}} | " + " | ".join(f"{str(c):>15}" for c in columns))
+    for name in names + ["total"]:
+        row = [sum(n for (s, c), n in counts.items() if c == column and name in (s, "total")) for column in columns]
+        total = sum(row) or 1
+        print(f"{name:<{width}} | " + " | ".join(f"{n:>7} ({n / total:5.1%})" for n in row))
+
+def resolve_sources(args):
+    """
+    Source name -> path, from `--sources` (config `data_path_<name>`) or `--input`.
+    """
+    if not args.sources:
+        return {Path(args.input).stem: args.input}
+    config = load_config(CONFIG_PATH)
+    return {name: config[f"data_path_{name}"] for name in args.sources}
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split QA JSONL into train/val (or k folds) by note, in one streaming pass.")
+    parser.add_argument("--input", default=DATA_PATH, help="QA JSONL to split")
+    parser.add_argument("--sources", nargs="+", help="Split these config datasets (data_path_<name>) together instead")
+    parser.add_argument("--train-path", default=TRAIN_PATH)
+    parser.add_argument("--val-path", default=VAL_PATH)
+    parser.add_argument("--train-split", type=float, default=TRAIN_SPLIT, help="Share of notes in the train split")
+    parser.add_argument("--folds", type=int, default=None, help="Write k train/val folds instead of one split")
+    parser.add_argument("--output-dir", default=FOLDS_DIR, help="Where fold_<i>/ directories are written")
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
 
-# Print summary of split sizes
-print(f"Train: {len(train)} | Validation: {len(val)}")
\ No newline at end of file
+    sources = resolve_sources(args)
+    if args.folds:
+        if args.folds < 2:
+            parser.error("--folds must be at least 2")
+        counts = split_folds(sources, args.output_dir, args.folds, seed=args.seed)
+        print_report(counts, list(range(args.folds)))
+        print(f"Saved {args.folds} folds to {args.output_dir}")
+    else:
+        counts = split_files(sources, args.train_path, args.val_path, train_split=args.train_split, seed=args.seed)
+        print_report(counts, ["train", "val"])
+        print(f"Saved {args.train_path} and {args.val_path}")
@@ -13,10 +13,10 @@ from transformers import (
     AutoModelForQuestionAnswering,
     TrainingArguments,
     Trainer,
-    default_data_collator,
+    DataCollatorWithPadding,
 )
 
-from src.data_utils import prepare_train_features
+from src.data_utils import load_tokenized_dataset
 
 # === Environment setup ===
 os.environ["CUDA_VISIBLE_DEVICES"] = ""
@@ -39,7 +39,7 @@ model.to(device)
 # === Load dataset ===
 cached_path = config["data_path"]
 print(f"Loading tokenized dataset from cache: {cached_path}")
-tokenized_dataset = torch.load(cached_path, weights_only=False)
+tokenized_dataset = load_tokenized_dataset(cached_path)
 
 sample = tokenized_dataset[0]
 for k, v in sample.items():
@@ -48,12 +48,10 @@ for k, v in sample.items():
     else:
         print(f"{k}: type={type(v)} — SKIPPED")
 
-tokenized_dataset.set_format(
-    type="torch",
-    columns=["input_ids", "attention_mask", "start_positions", "end_positions"],
-)
+# Pad each batch to its longest feature (rounded up to a multiple of 8 for tensor kernels)
+data_collator = DataCollatorWithPadding(tokenizer, pad_to_multiple_of=8)
 
-dl = DataLoader(tokenized_dataset, batch_size=16)
+dl = DataLoader(tokenized_dataset, batch_size=16, collate_fn=data_collator)
 first = next(iter(dl))
 print({k: (v.shape, v.dtype) for k, v in first.items()})
 
@@ -74,7 +72,8 @@ training_args = TrainingArguments(
     logging_steps=config["logging_steps"],
     save_total_limit=config["save_total_limit"],
     report_to=config["report_to"],
-    seed=config.get("seed", 42)
+    seed=config.get("seed", 42),
+    group_by_length=config.get("group_by_length", True),
 )
 
 # === Trainer ===
@@ -83,7 +82,7 @@ trainer = Trainer(
     args=training_args,
     train_dataset=tokenized_dataset,
     tokenizer=tokenizer,
-    data_collator=default_data_collator,
+    data_collator=data_collator,
 )
 
 # === Train ===
@@ -0,0 +1,19 @@
+# scripts/validate_spans.py
+
+# === Imports ===
+import argparse
+import time
+from src.span_validation import validate_file
+
+# === Main Logic ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and repair answer spans of a QA JSONL file.")
+    parser.add_argument("input_path")
+    parser.add_argument("output_path")
+    parser.add_argument("--num-proc", type=int, default=None, help="Worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    stats = validate_file(args.input_path, args.output_path, num_proc=args.num_proc)
+    elapsed = time.perf_counter() - t0
+    print(f"{sum(stats.values())} records in {elapsed:.2f}s ({sum(stats.values()) / elapsed:.0f} records/s)")
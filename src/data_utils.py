@@ -1,23 +1,65 @@
 # src/data_utils.py
 
 # === Imports ===
+import hashlib
 import json
-from datasets import load_dataset, Dataset
+import os
+from collections import Counter
+from pathlib import Path
+import numpy as np
+import torch
+from datasets import load_dataset, load_from_disk, Dataset, Features, Sequence, Value
+from src.jsonl_io import QA_SCHEMA, iter_jsonl
+from src.model_utils import tokenizer_fingerprint
+from src.span_validation import SPAN_VALIDATION_VERSION, format_stats, iter_validated
+
+# === Configuration ===
+# Stored as int32 straight from tokenization; the torch format hands them to training as int64
+TRAIN_FEATURES = Features({
+    "input_ids": Sequence(Value("int32")),
+    "token_type_ids": Sequence(Value("int32")),
+    "attention_mask": Sequence(Value("int32")),
+    "start_positions": Value("int32"),
+    "end_positions": Value("int32"),
+    "length": Value("int32"),  # Unpadded tokens, read by the length-grouped sampler
+})
+TRAIN_COLUMNS = ["input_ids", "attention_mask", "start_positions", "end_positions"]
+FINGERPRINT_SUFFIX = ".fingerprint"
+LEGACY_SUFFIX = ".pt"
+MANIFEST_SUFFIX = ".json"
+HASH_CHUNK_BYTES = 1 << 20
 
 # === Functions ===
 
 def load_qa_dataset(json_path: str) -> Dataset:
     """
-    Load QA data from a JSONL file into a Hugging Face Dataset.
+    Load QA data from a JSONL file into a Hugging Face Dataset. Records are streamed and
+    validated into Arrow without holding the file in memory; only the QA fields are kept.
+    Answer spans are checked against their context: wrong offsets are repaired and answers
+    missing from the context are dropped.
     """
-    with open(json_path, "r") as f:
-        data = [json.loads(line) for line in f]
-    return Dataset.from_list(data)
+    return Dataset.from_generator(
+        _iter_qa_records,
+        # The content hash keys the datasets cache, so an edited file is never served stale
+        gen_kwargs={"json_path": str(json_path), "content_hash": file_sha256(json_path)},
+    )
+
+def _iter_qa_records(json_path, content_hash):
+    """
+    Generator behind `load_qa_dataset`.
+    """
+    stats = Counter()
+    for record in iter_validated(iter_jsonl(json_path, schema=QA_SCHEMA), stats):
+        yield {field: record[field] for field in QA_SCHEMA}
+    print(f"Span validation for {json_path}: {format_stats(stats)}")
 
 def prepare_train_features(examples, tokenizer, config):
     """
-    Tokenize and align answer spans for QA training.
+    Tokenize and align answer spans for QA training. Features are padded to `max_length`
+    unless `pad_to_max_length` is false in the config, in which case each one keeps only
+    its own tokens and padding is left to the collator.
     """
+    pad_to_max_length = config.get("pad_to_max_length", True)
     tokenized_examples = tokenizer(
         examples["question"],
         examples["context"],
@@ -26,42 +68,191 @@ def prepare_train_features(examples, tokenizer, config):
         stride=config["doc_stride"],
         return_overflowing_tokens=True,
         return_offsets_mapping=True,
-        padding="max_length",
+        padding="max_length" if pad_to_max_length else "longest",
     )
 
-    sample_mapping = tokenized_examples.pop("overflow_to_sample_mapping")
-    offset_mapping = tokenized_examples["offset_mapping"]
-
-    start_positions = []
-    end_positions = []
-
-    for i, offsets in enumerate(offset_mapping):
-        input_ids = tokenized_examples["input_ids"][i]
-        cls_index = input_ids.index(tokenizer.cls_token_id)
-
-        sample_idx = sample_mapping[i]
-        answer = examples["answer_text"][sample_idx]
-        start_char = examples["answer_start"][sample_idx]
-        end_char = start_char + len(answer)
-
-        sequence_ids = tokenized_examples.sequence_ids(i)
-        context_start = sequence_ids.index(1)
-        context_end = len(sequence_ids) - 1 - sequence_ids[::-1].index(1)
-
-        # If answer is not fully inside the context, label as CLS
-        if not (offsets[context_start][0] <= start_char and offsets[context_end][1] >= end_char):
-            start_positions.append(cls_index)
-            end_positions.append(cls_index)
-        else:
-            token_start = context_start
-            token_end = context_end
-            while token_start < len(offsets) and offsets[token_start][0] <= start_char:
-                token_start += 1
-            while token_end >= 0 and offsets[token_end][1] >= end_char:
-                token_end -= 1
-            start_positions.append(token_start - 1)
-            end_positions.append(token_end + 1)
+    sample_mapping = np.asarray(tokenized_examples.pop("overflow_to_sample_mapping"))
+    num_features = len(sample_mapping)
+    sequence_ids = np.array(
+        [tokenized_examples.sequence_ids(i) for i in range(num_features)], dtype=float
+    )  # None (special tokens, padding) becomes NaN
+
+    start_chars = np.asarray(examples["answer_start"], dtype=np.int64)
+    end_chars = start_chars + np.array([len(answer) for answer in examples["answer_text"]], dtype=np.int64)
+
+    start_positions, end_positions = align_answer_spans(
+        np.asarray(tokenized_examples["offset_mapping"], dtype=np.int64),
+        sequence_ids,
+        np.asarray(tokenized_examples["input_ids"]),
+        tokenizer.cls_token_id,
+        start_chars[sample_mapping],
+        end_chars[sample_mapping],
+        clip_to_context=not pad_to_max_length,
+    )
+    start_positions = start_positions.tolist()
+    end_positions = end_positions.tolist()
+
+    lengths = [sum(mask) for mask in tokenized_examples["attention_mask"]]
+    if not pad_to_max_length:
+        for key in ("input_ids", "token_type_ids", "attention_mask", "offset_mapping"):
+            tokenized_examples[key] = [row[:n] for row, n in zip(tokenized_examples[key], lengths)]
+    tokenized_examples["length"] = lengths
 
     tokenized_examples["start_positions"] = start_positions
     tokenized_examples["end_positions"] = end_positions
-    return tokenized_examples
\ No newline at end of file
+    return tokenized_examples
+
+def align_answer_spans(offsets, sequence_ids, input_ids, cls_token_id, start_chars, end_chars,
+                       clip_to_context=False):
+    """
+    Token start/end labels for a batch of features, as arrays of shape (N,).
+
+    `offsets` is (N, L, 2), `sequence_ids` (N, L) with NaN outside both sequences, and the
+    char spans are already mapped to each feature's example. Answers not fully inside the
+    feature's context window are labelled with the CLS index. Otherwise the start is the
+    token before the first one (from the context start on) beginning after `start_char`,
+    and the end the token after the last one (up to the context end) ending before
+    `end_char`, matching the token-by-token scan this replaces.
+
+    That scan runs past the context into padding when the answer starts on the last
+    context token (and into the question when it ends on the first), so the label lands
+    outside the context. `clip_to_context` pins such labels to the context bounds; it is
+    required once padding is trimmed, since the label would otherwise point past the end.
+    """
+    positions = np.arange(offsets.shape[1])
+
+    is_cls = input_ids == cls_token_id
+    is_context = sequence_ids == 1
+    if not is_cls.any(axis=1).all() or not is_context.any(axis=1).all():
+        raise ValueError("Every feature needs a CLS token and at least one context token")
+    cls_index = is_cls.argmax(axis=1)
+    context_start = is_context.argmax(axis=1)
+    context_end = offsets.shape[1] - 1 - is_context[:, ::-1].argmax(axis=1)
+
+    rows = np.arange(len(offsets))
+    inside = (offsets[rows, context_start, 0] <= start_chars) & (offsets[rows, context_end, 1] >= end_chars)
+
+    after_start = (positions >= context_start[:, None]) & (offsets[:, :, 0] > start_chars[:, None])
+    token_start = np.where(after_start.any(axis=1), after_start.argmax(axis=1), offsets.shape[1])
+
+    before_end = (positions <= context_end[:, None]) & (offsets[:, :, 1] < end_chars[:, None])
+    token_end = np.where(
+        before_end.any(axis=1), offsets.shape[1] - 1 - before_end[:, ::-1].argmax(axis=1), -1
+    )
+
+    token_start, token_end = token_start - 1, token_end + 1
+    if clip_to_context:
+        token_start = np.minimum(token_start, context_end)
+        token_end = np.maximum(token_end, context_start)
+
+    start_positions = np.where(inside, token_start, cls_index)
+    end_positions = np.where(inside, token_end, cls_index)
+    return start_positions, end_positions
+
+def tokenize_train_batch(examples, tokenizer, config):
+    """
+    `prepare_train_features` restricted to the columns training consumes, for `Dataset.map`.
+    """
+    tokenized = prepare_train_features(examples, tokenizer, config)
+    return {name: tokenized[name] for name in TRAIN_FEATURES}
+
+def file_sha256(path):
+    """
+    SHA-256 of a file's contents, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def tokenization_settings(tokenizer, config):
+    """
+    Everything besides the input records that determines the tokenized features.
+    """
+    return {
+        "tokenizer": tokenizer_fingerprint(tokenizer),
+        "max_length": config["max_length"],
+        "doc_stride": config["doc_stride"],
+        "pad_to_max_length": config.get("pad_to_max_length", True),
+        "span_validation": SPAN_VALIDATION_VERSION,
+    }
+
+def preprocessing_fingerprint(data_path, tokenizer, config):
+    """
+    Identify a tokenized dataset by its input file, tokenizer, windowing and padding settings.
+    """
+    return json.dumps({"data": file_sha256(data_path), **tokenization_settings(tokenizer, config)}, sort_keys=True)
+
+def fingerprint_path(save_path):
+    """
+    Sidecar file recording the fingerprint a tokenized dataset was built from.
+    """
+    return Path(str(save_path) + FINGERPRINT_SUFFIX)
+
+def tokenize_qa_file(data_path, tokenizer, config, num_proc=None):
+    """
+    Tokenize a JSONL QA file into training features with the fast tokenizer's batched path,
+    spread over `num_proc` processes.
+    """
+    raw_dataset = load_qa_dataset(data_path)
+    num_proc = max(1, min(num_proc or os.cpu_count() or 1, len(raw_dataset)))
+    return raw_dataset.map(
+        tokenize_train_batch,
+        fn_kwargs={"tokenizer": tokenizer, "config": config},
+        batched=True,
+        num_proc=num_proc if num_proc > 1 else None,
+        remove_columns=raw_dataset.column_names,
+        features=TRAIN_FEATURES,
+        desc="Tokenizing",
+    )
+
+def preprocess_dataset(name, config, tokenizer, num_proc=None, force=False):
+    """
+    Tokenize the raw JSONL configured as `data_path_<name>` and save it to its
+    `processed_paths` entry. Skipped when the saved dataset was built from the same
+    input file, tokenizer and windowing settings, unless `force` is set.
+    """
+    data_path = config[f"data_path_{name}"]
+    save_path = Path(config["processed_paths"][name])
+    fingerprint = preprocessing_fingerprint(data_path, tokenizer, config)
+
+    sidecar = fingerprint_path(save_path)
+    if not force and save_path.exists() and sidecar.exists() and sidecar.read_text() == fingerprint:
+        print(f"Up to date, skipping: {save_path}")
+        return save_path
+
+    tokenized_dataset = tokenize_qa_file(data_path, tokenizer, config, num_proc=num_proc)
+    print(f"{len(tokenized_dataset)} features from {data_path}")
+    save_tokenized_dataset(tokenized_dataset, save_path)
+    sidecar.write_text(fingerprint)
+    return save_path
+
+def save_tokenized_dataset(dataset, save_path):
+    """
+    Save a tokenized dataset as an Arrow directory that `load_tokenized_dataset` memory-maps.
+    """
+    save_path = Path(save_path)
+    save_path.parent.mkdir(parents=True, exist_ok=True)
+    dataset.save_to_disk(str(save_path))
+    print(f"Saved tokenized dataset to: {save_path}")
+
+def load_tokenized_dataset(path, columns=TRAIN_COLUMNS):
+    """
+    Load a tokenized dataset for training, formatted as torch tensors over `columns`.
+    `path` is an Arrow directory, a shard manifest (`.json`) or a legacy `.pt` file.
+
+    Arrow directories written by `save_tokenized_dataset` are memory-mapped, so loading is
+    near-instant and rows are paged in as they are read. Legacy `.pt` pickles are still
+    accepted; they are unpickled whole into RAM, so only load ones you produced yourself.
+    """
+    if str(path).endswith(LEGACY_SUFFIX):
+        print(f"Loading legacy pickled dataset (re-run scripts/preprocess.py to convert): {path}")
+        dataset = torch.load(path, weights_only=False)
+    elif str(path).endswith(MANIFEST_SUFFIX):
+        from src.dataset_shards import load_manifest_dataset  # Deferred: that module imports this one
+        dataset = load_manifest_dataset(path)
+    else:
+        dataset = load_from_disk(str(path))
+    dataset.set_format(type="torch", columns=columns)
+    return dataset
@@ -0,0 +1,227 @@
+# src/dataset_shards.py
+
+# === Imports ===
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+from collections import Counter
+from pathlib import Path
+from datasets import Dataset, concatenate_datasets, load_from_disk
+from src.data_utils import TRAIN_FEATURES, file_sha256, tokenization_settings, tokenize_train_batch
+from src.jsonl_io import QA_SCHEMA, iter_jsonl
+from src.span_validation import format_stats, iter_validated
+
+# === Configuration ===
+# Shard boundaries fall after records whose hash is divisible by this, so shards average
+# this many records and an inserted or edited record only changes the shard around it
+SHARD_TARGET_RECORDS = 256
+MAX_SHARD_RECORDS = 4 * SHARD_TARGET_RECORDS  # Caps the rare long run without a boundary
+MANIFEST_VERSION = 1
+
+# === Hashing ===
+
+def record_hash(record):
+    """
+    Content hash of a record's QA fields; other metadata does not affect training features.
+    """
+    payload = json.dumps({field: record[field] for field in QA_SCHEMA}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def shard_key(record_hashes, settings_hash):
+    """
+    Address of a tokenized shard: its records' hashes plus the tokenization settings.
+    """
+    digest = hashlib.sha256(settings_hash.encode("utf-8"))
+    for h in record_hashes:
+        digest.update(h.encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+def settings_hash(settings):
+    """
+    Stable hash of the tokenizer fingerprint and windowing/padding settings.
+    """
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+# === Sharding ===
+
+def iter_shards(path):
+    """
+    Stream a QA JSONL file as content-defined shards of (records, record hashes). Spans
+    are validated first, so a shard is keyed by the repaired records it will tokenize.
+    """
+    records, hashes = [], []
+    stats = Counter()
+    for record in iter_validated(iter_jsonl(path, schema=QA_SCHEMA), stats):
+        h = record_hash(record)
+        records.append({field: record[field] for field in QA_SCHEMA})
+        hashes.append(h)
+        if int(h[:8], 16) % SHARD_TARGET_RECORDS == 0 or len(records) == MAX_SHARD_RECORDS:
+            yield records, hashes
+            records, hashes = [], []
+    if records:
+        yield records, hashes
+    print(f"Span validation for {path}: {format_stats(stats)}")
+
+# === Tokenization ===
+
+_worker_state = {}
+
+def _init_worker(model_name, config):
+    """
+    Load the tokenizer once per worker process.
+    """
+    from transformers import AutoTokenizer
+    _worker_state["tokenizer"] = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+    _worker_state["config"] = config
+
+def _build_shard(args):
+    """
+    Tokenize one shard's records and save them under `shard_path`. The shard is written to
+    a temporary directory and renamed into place, so an interrupted build never leaves a
+    partial shard behind and a rerun picks up where it stopped.
+    """
+    records, shard_path = args
+    shard_path = Path(shard_path)
+    tmp_path = shard_path.with_name(shard_path.name + ".tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+
+    raw = Dataset.from_list(records)
+    tokenized = raw.map(
+        tokenize_train_batch,
+        fn_kwargs={"tokenizer": _worker_state["tokenizer"], "config": _worker_state["config"]},
+        batched=True,
+        remove_columns=raw.column_names,
+        features=TRAIN_FEATURES,
+    )
+    tokenized.save_to_disk(str(tmp_path))
+    os.replace(tmp_path, shard_path)
+    return len(tokenized)
+
+# === Build ===
+
+def load_manifest(manifest_path):
+    """
+    Read a shard manifest, or return None if there is none yet.
+    """
+    manifest_path = Path(manifest_path)
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def build_incremental(sources, config, tokenizer, shard_dir, manifest_path, num_proc=None):
+    """
+    Tokenize each source JSONL (name -> path) into content-addressed shards under
+    `shard_dir` and write a manifest listing them. Shards that already exist are reused,
+    so a rebuild only tokenizes new or changed records; sources whose file hash matches
+    the previous manifest are not even re-read. Other sources in the previous manifest
+    keep their entries, unless the tokenization settings changed and their shards no
+    longer apply. Returns the manifest.
+    """
+    shard_dir = Path(shard_dir)
+    manifest_path = Path(manifest_path)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    settings = tokenization_settings(tokenizer, config)
+    settings_id = settings_hash(settings)
+    previous = load_manifest(manifest_path) or {}
+    previous_sources = previous.get("sources", {}) if previous.get("settings") == settings else {}
+    dropped = [name for name in previous.get("sources", {}) if name not in sources and name not in previous_sources]
+    if dropped:
+        print(f"Tokenization settings changed; dropping {', '.join(dropped)} from the manifest until rebuilt")
+
+    manifest_sources = {name: source for name, source in previous_sources.items() if name not in sources}
+    pending = {}  # shard key -> records still to tokenize
+    for name, path in sources.items():
+        content_hash = file_sha256(path)
+        old = previous_sources.get(name)
+        if old and old["content_hash"] == content_hash and all((shard_dir / s["key"]).exists() for s in old["shards"]):
+            manifest_sources[name] = old
+            print(f"{name}: unchanged, reusing {len(old['shards'])} shards")
+            continue
+
+        shards = []
+        for records, hashes in iter_shards(path):
+            key = shard_key(hashes, settings_id)
+            shards.append({"key": key, "records": len(records)})
+            if not (shard_dir / key).exists():
+                pending[key] = records
+        manifest_sources[name] = {"path": str(path), "content_hash": content_hash, "shards": shards}
+        new = sum(1 for s in shards if s["key"] in pending)
+        print(f"{name}: {len(shards)} shards, {new} to tokenize")
+
+    features = {}
+    if pending:
+        num_proc = max(1, min(num_proc or os.cpu_count() or 1, len(pending)))
+        jobs = [(records, str(shard_dir / key)) for key, records in pending.items()]
+        if num_proc == 1:
+            _init_worker(config["model_name"], config)
+            counts = map(_build_shard, jobs)
+            features = dict(zip(pending, counts))
+        else:
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(num_proc, initializer=_init_worker, initargs=(config["model_name"], config)) as pool:
+                features = dict(zip(pending, pool.imap(_build_shard, jobs)))
+        print(f"Tokenized {sum(len(r) for r in pending.values())} records into {len(pending)} new shards")
+
+    # Feature counts of reused shards come from their saved metadata
+    for source in manifest_sources.values():
+        for shard in source["shards"]:
+            if "features" not in shard:
+                shard["features"] = features.get(shard["key"]) or len(load_from_disk(str(shard_dir / shard["key"])))
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "settings": settings,
+        "shard_dir": os.path.relpath(shard_dir, manifest_path.parent),
+        "sources": manifest_sources,
+    }
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    total = sum(s["features"] for source in manifest_sources.values() for s in source["shards"])
+    print(f"Saved manifest with {total} features to: {manifest_path}")
+    return manifest
+
+def manifest_keys(manifest):
+    """
+    Keys of every shard a manifest lists.
+    """
+    return {s["key"] for source in (manifest or {}).get("sources", {}).values() for s in source["shards"]}
+
+def prune_shards(shard_dir, manifests, candidates=None):
+    """
+    Delete shards (and leftover temporary directories) not referenced by any manifest.
+    With `candidates`, only those shard keys may be deleted, so shards that other builds
+    sharing `shard_dir` may still use are left alone.
+    """
+    shard_dir = Path(shard_dir)
+    keep = set().union(*(manifest_keys(manifest) for manifest in manifests))
+    removed = 0
+    for path in shard_dir.iterdir():
+        is_candidate = candidates is None or path.name in candidates or path.name.endswith(".tmp")
+        if path.is_dir() and path.name not in keep and is_candidate:
+            shutil.rmtree(path)
+            removed += 1
+    print(f"Pruned {removed} unreferenced shards from {shard_dir}")
+
+def load_manifest_dataset(manifest_path):
+    """
+    Concatenate a manifest's shards into one dataset. Shards are memory-mapped, so
+    nothing is copied; a shard listed by several sources is included once per listing.
+    """
+    manifest_path = Path(manifest_path)
+    manifest = load_manifest(manifest_path)
+    if manifest is None:
+        raise FileNotFoundError(f"No shard manifest at {manifest_path}")
+    shard_dir = manifest_path.parent / manifest["shard_dir"]
+    shards = [
+        load_from_disk(str(shard_dir / shard["key"]))
+        for source in manifest["sources"].values()
+        for shard in source["shards"]
+    ]
+    return concatenate_datasets(shards)
@@ -0,0 +1,213 @@
+# src/eval_engine.py
+
+# === Imports ===
+import json
+import multiprocessing
+import os
+import time
+import torch
+from torch.utils.data import DataLoader
+from src.eval_utils import compute_scores, summarize_scores
+from src.jsonl_io import JsonlWriter, read_jsonl
+from src.model_utils import build_features, decode_spans, get_model, get_tokenizer, pad_features, tokenizer_fingerprint
+
+# === Data Loading ===
+
+def load_examples(path):
+    """
+    Load eval examples from a JSONL file.
+    """
+    return read_jsonl(path)
+
+def tokenize_examples(examples, tokenizer, max_length, doc_stride, max_question_length=None):
+    """
+    Build model input windows for every example; `sample_idx` points back into `examples`.
+    """
+    pairs = [(ex["context"], ex["question"]) for ex in examples]
+    features, errors = build_features(pairs, tokenizer, max_length, doc_stride, max_question_length)
+    if errors:
+        idx, error = next(iter(errors.items()))
+        raise ValueError(f"Could not tokenize example {idx}: {error}")
+    return features
+
+# === Inference ===
+
+def predict(model, tokenizer, examples, features, batch_size):
+    """
+    Run batched inference over pre-tokenized features and return one answer per example.
+    Features are batched in length order so each batch is padded only to similar lengths.
+    """
+    features = sorted(features, key=lambda feature: len(feature["input_ids"]))
+    loader = DataLoader(
+        features,
+        batch_size=batch_size,
+        collate_fn=lambda batch: pad_features(batch, tokenizer.pad_token_id),
+    )
+    best = {}
+    offset = 0
+    model.eval()
+    for batch in loader:
+        with torch.inference_mode():
+            outputs = model(
+                input_ids=batch["input_ids"],
+                token_type_ids=batch["token_type_ids"],
+                attention_mask=batch["attention_mask"],
+            )
+        scores, starts, ends = decode_spans(outputs.start_logits, outputs.end_logits, batch["context_mask"])
+        batch_features = features[offset:offset + len(scores)]
+        for feature, score, start, end in zip(batch_features, scores[:, 0].tolist(), starts[:, 0].tolist(), ends[:, 0].tolist()):
+            sample_idx = feature["sample_idx"]
+            if score >= 0 and (sample_idx not in best or score > best[sample_idx][0]):
+                offsets = feature["offsets"]
+                best[sample_idx] = (score, examples[sample_idx]["context"][offsets[start][0]:offsets[end][1]])
+        offset += len(scores)
+    return [best.get(i, (0.0, ""))[1] for i in range(len(examples))]
+
+# === Multi-Process Inference ===
+
+_worker_state = {}
+
+def _init_worker(model_path, quantized, num_threads):
+    """
+    Load one model per worker process, pinned to its share of the CPU threads.
+    """
+    torch.set_num_threads(num_threads)
+    _worker_state["tokenizer"] = get_tokenizer(model_path)
+    _worker_state["model"] = get_model(model_path, quantized=quantized)
+
+def _predict_shard(args):
+    """
+    Tokenize and answer one contiguous shard of examples inside a worker.
+    """
+    examples, batch_size, max_length, doc_stride, max_question_length = args
+    tokenizer, model = _worker_state["tokenizer"], _worker_state["model"]
+    features = tokenize_examples(examples, tokenizer, max_length, doc_stride, max_question_length)
+    return predict(model, tokenizer, examples, features, batch_size)
+
+def start_worker_pool(model_path, quantized, num_workers):
+    """
+    Start `num_workers` processes that each hold their own copy of a checkpoint.
+    """
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    num_threads = max(1, cores // num_workers)
+    # Spawned (not forked) workers don't inherit the parent's torch thread pools
+    context = multiprocessing.get_context("spawn")
+    return context.Pool(num_workers, initializer=_init_worker, initargs=(model_path, quantized, num_threads))
+
+def predict_parallel(pool, examples, batch_size, max_length, doc_stride, num_workers, shards_per_worker=4,
+                     max_question_length=None):
+    """
+    Shard examples across the pool and merge predictions back in the original order.
+    Shards are contiguous and smaller than one per worker, so long documents don't leave
+    one worker running alone at the end.
+    """
+    num_shards = min(len(examples), num_workers * shards_per_worker) or 1
+    bounds = [round(i * len(examples) / num_shards) for i in range(num_shards + 1)]
+    shards = [
+        (examples[bounds[i]:bounds[i + 1]], batch_size, max_length, doc_stride, max_question_length)
+        for i in range(num_shards)
+    ]
+    predictions = []
+    # imap yields shard results in submission order, so the merge is deterministic
+    for shard_predictions in pool.imap(_predict_shard, shards):
+        predictions.extend(shard_predictions)
+    return predictions
+
+# === Results ===
+
+def write_results(examples, predictions, predictions_path, metrics_path, lowercase_outputs=False):
+    """
+    Score predictions and write the predictions JSONL and metrics JSON.
+    """
+    ems, f1s = compute_scores(predictions, [ex["answer_text"] for ex in examples])
+
+    with JsonlWriter(predictions_path) as writer:
+        for ex, pred in zip(examples, predictions):
+            ref = ex["answer_text"]
+            if lowercase_outputs:
+                pred, ref = pred.lower().strip(), ref.lower().strip()
+            writer.write({
+                "context": ex["context"],
+                "question": ex["question"],
+                "prediction": pred,
+                "reference": ref
+            })
+    print(f"Saved predictions to: {predictions_path}")
+
+    metrics = summarize_scores(ems, f1s)
+    os.makedirs(os.path.dirname(metrics_path) or ".", exist_ok=True)
+    with open(metrics_path, "w") as f:
+        json.dump(metrics, f, indent=2)
+    print(f"Saved eval results to: {metrics_path}")
+    return metrics
+
+# === Engine ===
+
+def run_evaluations(config, run_names=None, quantized=False, num_workers=None):
+    """
+    Evaluate the configured runs. Each checkpoint is loaded once and each eval set is
+    tokenized once per tokenizer, however many runs share them. With `quantized`, the
+    int8 artifact of each checkpoint is used and results get an `_int8` suffix. With
+    `num_workers` > 1, each run is sharded across that many processes, each holding its
+    own copy of the checkpoint.
+    """
+    runs = config["runs"]
+    run_names = run_names or list(runs)
+    batch_size = config.get("batch_size", 32)
+    max_length = config.get("max_length", 384)
+    doc_stride = config.get("doc_stride", 128)
+    max_question_length = config.get("max_question_length")
+    num_workers = num_workers or config.get("num_workers", 1)
+
+    examples_cache = {}
+    features_cache = {}
+    all_metrics = {}
+    # Group runs by checkpoint so each model is loaded only once
+    for model_name in dict.fromkeys(runs[name]["model"] for name in run_names):
+        model_path = config["models"][model_name]
+        print(f"\n--- Loading model: {model_path}{' (int8)' if quantized else ''}"
+              + (f" in {num_workers} worker processes" if num_workers > 1 else ""))
+        pool = None
+        if num_workers > 1:
+            pool = start_worker_pool(model_path, quantized, num_workers)
+        else:
+            tokenizer = get_tokenizer(model_path)
+            model = get_model(model_path, quantized=quantized)
+
+        for run_name in [name for name in run_names if runs[name]["model"] == model_name]:
+            run = runs[run_name]
+            dataset_path = config["datasets"][run["dataset"]]
+            if dataset_path not in examples_cache:
+                examples_cache[dataset_path] = load_examples(dataset_path)
+            examples = examples_cache[dataset_path]
+
+            t0 = time.perf_counter()
+            if pool is not None:
+                predictions = predict_parallel(pool, examples, batch_size, max_length, doc_stride, num_workers,
+                                               max_question_length=max_question_length)
+            else:
+                features_key = (dataset_path, tokenizer_fingerprint(tokenizer), max_length, doc_stride, max_question_length)
+                if features_key not in features_cache:
+                    features_cache[features_key] = tokenize_examples(examples, tokenizer, max_length, doc_stride,
+                                                                     max_question_length)
+                predictions = predict(model, tokenizer, examples, features_cache[features_key], batch_size)
+            elapsed = time.perf_counter() - t0
+
+            predictions_path, metrics_path = run["predictions_path"], run["metrics_path"]
+            if quantized:
+                # Keep int8 results next to, not on top of, the fp32 ones
+                predictions_path = predictions_path.replace(".jsonl", "_int8.jsonl")
+                metrics_path = metrics_path.replace(".json", "_int8.json")
+            metrics = write_results(examples, predictions, predictions_path, metrics_path,
+                                    run.get("lowercase_outputs", False))
+            all_metrics[run_name] = metrics
+
+            print(f"\nEvaluation Results ({run_name}):")
+            print(f"Exact Match: {metrics['exact_match']}%")
+            print(f"F1 Score: {metrics['f1_score']}%")
+            print(f"Throughput: {len(examples) / elapsed:.1f} examples/sec")
+
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return all_metrics
@@ -1,47 +1,96 @@
 # src/eval_utils.py
 
 # === Imports ===
-import evaluate
+import json
 from collections import Counter
+from functools import lru_cache
 import re
 import string
 
+# === Precompiled Patterns ===
+ARTICLES_PATTERN = re.compile(r'\b(a|an|the)\b')
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
 # === Text Normalization ===
 
+@lru_cache(maxsize=65536)
 def normalize_answer(s):
     """
     Lower text, remove punctuation, articles, and extra whitespace.
+    Results are memoized, so references shared across examples are normalized once.
     """
-    def remove_articles(text):
-        return re.sub(r'\b(a|an|the)\b', ' ', text)
-    def white_space_fix(text):
-        return ' '.join(text.split())
-    def remove_punc(text):
-        return ''.join(ch for ch in text if ch not in string.punctuation)
-    def lower(text):
-        return text.lower()
-    return white_space_fix(remove_articles(remove_punc(lower(s))))
-
-# === Evaluation Metrics ===
+    text = s.lower().translate(PUNCTUATION_TABLE)
+    return ' '.join(ARTICLES_PATTERN.sub(' ', text).split())
 
-def f1_score(prediction, ground_truth):
+@lru_cache(maxsize=65536)
+def _answer_tokens(s):
     """
-    Compute the F1 score between prediction and ground truth answers.
+    Normalized tokens of an answer and their counts.
     """
-    pred_tokens = normalize_answer(prediction).split()
-    gt_tokens = normalize_answer(ground_truth).split()
-    common = Counter(pred_tokens) & Counter(gt_tokens)
-    num_same = sum(common.values())
+    tokens = normalize_answer(s).split()
+    return tokens, Counter(tokens)
+
+# === Evaluation Metrics ===
+
+def _f1_from_tokens(pred, gt):
+    pred_tokens, pred_counts = pred
+    gt_tokens, gt_counts = gt
     if len(pred_tokens) == 0 or len(gt_tokens) == 0:
         return int(pred_tokens == gt_tokens)
+    num_same = sum((pred_counts & gt_counts).values())
     if num_same == 0:
         return 0
     precision = num_same / len(pred_tokens)
     recall = num_same / len(gt_tokens)
     return 2 * precision * recall / (precision + recall)
 
+def f1_score(prediction, ground_truth):
+    """
+    Compute the F1 score between prediction and ground truth answers.
+    """
+    return _f1_from_tokens(_answer_tokens(prediction), _answer_tokens(ground_truth))
+
 def exact_match_score(prediction, ground_truth):
     """
     Check if the normalized prediction exactly matches the ground truth.
     """
-    return normalize_answer(prediction) == normalize_answer(ground_truth)
\ No newline at end of file
+    return normalize_answer(prediction) == normalize_answer(ground_truth)
+
+# === Batch Metrics ===
+
+def compute_scores(predictions, references):
+    """
+    Compute per-example EM and F1 for parallel lists of predictions and references.
+    Each distinct string is normalized and tokenized once for both metrics.
+    """
+    ems, f1s = [], []
+    for prediction, reference in zip(predictions, references):
+        pred, ref = _answer_tokens(prediction), _answer_tokens(reference)
+        ems.append(normalize_answer(prediction) == normalize_answer(reference))
+        f1s.append(_f1_from_tokens(pred, ref))
+    return ems, f1s
+
+def summarize_scores(ems, f1s):
+    """
+    Aggregate per-example scores into the metrics JSON written by the eval scripts.
+    """
+    return {
+        "exact_match": round(100 * sum(ems) / len(ems), 2),
+        "f1_score": round(100 * sum(f1s) / len(f1s), 2),
+        "num_eval_examples": len(ems)
+    }
+
+def score_predictions_file(path):
+    """
+    Score a predictions JSONL file (`prediction` / `reference` per line) in one pass.
+    Returns (metrics, ems, f1s).
+    """
+    predictions, references = [], []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                ex = json.loads(line)
+                predictions.append(ex["prediction"])
+                references.append(ex["reference"])
+    ems, f1s = compute_scores(predictions, references)
+    return summarize_scores(ems, f1s), ems, f1s
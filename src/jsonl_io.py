@@ -0,0 +1,184 @@
+# src/jsonl_io.py
+
+# === Imports ===
+import json
+from pathlib import Path
+
+# orjson is several times faster than the standard library; it is optional
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# === Configuration ===
+# Field types every extractive QA record must have
+QA_SCHEMA = {"context": str, "question": str, "answer_text": str, "answer_start": int}
+WRITE_BUFFER_RECORDS = 1000
+
+# === Serialization ===
+
+def _reject_constant(name):
+    """
+    `parse_constant` hook for the fallback: orjson rejects NaN, Infinity and -Infinity.
+    """
+    raise ValueError(f"Invalid JSON constant: {name}")
+
+def loads(line):
+    """
+    Parse one JSON document from a str or bytes line. Both paths reject the NaN and
+    Infinity literals the standard library would otherwise accept.
+    """
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line, parse_constant=_reject_constant)
+
+def _orjson_compatible(value):
+    """
+    Copy of `value` with the standard library's extensions to JSON removed, so the
+    fallback accepts and writes what orjson does: NaN and infinities become null, and
+    integers beyond 64 bits raise TypeError. Non-str keys are converted by both paths.
+    """
+    if isinstance(value, float):
+        return value if value == value and value not in (float("inf"), float("-inf")) else None
+    if isinstance(value, int) and not isinstance(value, bool):
+        if not -(1 << 63) <= value < (1 << 64):
+            raise TypeError(f"Integer exceeds 64-bit range: {value}")
+        return value
+    if isinstance(value, dict):
+        return {key: _orjson_compatible(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_orjson_compatible(item) for item in value]
+    return value
+
+def dumps(record):
+    """
+    Serialize one record to a single-line, compact JSON string (no trailing newline).
+    The output is the same with or without orjson. Unlike `json.dumps`' defaults, there is
+    no space after separators and non-ASCII text is written as UTF-8, not `\\u` escapes.
+    """
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(_orjson_compatible(record), ensure_ascii=False, separators=(",", ":"))
+
+# === Validation ===
+
+class SchemaError(ValueError):
+    """
+    A JSONL record is missing a required field or has one of the wrong type.
+    """
+
+def validate_record(record, schema):
+    """
+    Check that `record` has every field in `schema` with the expected type.
+    """
+    if not isinstance(record, dict):
+        raise SchemaError(f"expected a JSON object, got {type(record).__name__}")
+    for field, expected in schema.items():
+        if field not in record:
+            raise SchemaError(f"missing field '{field}'")
+        value = record[field]
+        # bool is a subclass of int, but `true` is never a valid offset
+        if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+            raise SchemaError(f"field '{field}' should be {expected.__name__}, got {type(value).__name__}")
+
+# === Reading ===
+
+def iter_jsonl(path, schema=None, skip_invalid=False):
+    """
+    Yield records from a JSONL file one at a time, so memory stays flat however large the
+    file is. Blank lines are ignored. With `schema`, each record is validated; invalid or
+    unparseable lines raise with their line number, or are reported and skipped when
+    `skip_invalid` is set.
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = loads(line)
+                if schema is not None:
+                    validate_record(record, schema)
+            except ValueError as e:  # JSONDecodeError, orjson.JSONDecodeError and SchemaError
+                if not skip_invalid:
+                    raise SchemaError(f"{path.name}, line {line_no}: {e}") from e
+                print(f"Skipping line {line_no} in {path.name}: {e}")
+                continue
+            yield record
+
+def read_jsonl(path, schema=None, skip_invalid=False):
+    """
+    Read a whole JSONL file into a list; prefer `iter_jsonl` when one pass is enough.
+    """
+    return list(iter_jsonl(path, schema=schema, skip_invalid=skip_invalid))
+
+# === Writing ===
+
+class JsonlWriter:
+    """
+    Write records to a JSONL file, buffering serialized lines and flushing them in bulk.
+
+    Use as a context manager so the final partial buffer is always written:
+
+        with JsonlWriter(path) as writer:
+            for record in records:
+                writer.write(record)
+    """
+
+    def __init__(self, path, mode="w", buffer_records=WRITE_BUFFER_RECORDS):
+        self.path = Path(path)
+        self.mode = mode
+        self.buffer_records = max(1, int(buffer_records))
+        self.count = 0
+        self._buffer = []
+        self._file = None
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, self.mode, encoding="utf-8")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, record):
+        """
+        Queue one record, flushing once the buffer is full.
+        """
+        self._buffer.append(dumps(record))
+        self.count += 1
+        if len(self._buffer) >= self.buffer_records:
+            self.flush()
+
+    def write_many(self, records):
+        """
+        Queue every record from an iterable.
+        """
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        """
+        Write buffered lines to the file.
+        """
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._buffer = []
+        self._file.flush()
+
+    def close(self):
+        """
+        Flush the remaining buffer and close the file.
+        """
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+def write_jsonl(path, records, mode="w"):
+    """
+    Write an iterable of records to a JSONL file and return how many were written.
+    """
+    with JsonlWriter(path, mode=mode) as writer:
+        writer.write_many(records)
+    return writer.count
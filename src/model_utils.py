@@ -1,7 +1,15 @@
 # src/model_utils.py
 
 # === Imports ===
-from transformers import AutoTokenizer, AutoModelForQuestionAnswering
+import hashlib
+import json
+import os
+import torch
+from transformers import AutoConfig, AutoTokenizer, AutoModelForQuestionAnswering
+
+# === Constants ===
+QUANTIZED_WEIGHTS_NAME = "quantized_int8.pt"
+MAX_ANSWER_LENGTH = 15
 
 # === Model and Tokenizer Utilities ===
 
@@ -11,8 +19,181 @@ def get_tokenizer(model_name: str):
     """
     return AutoTokenizer.from_pretrained(model_name)
 
-def get_model(model_name: str):
+def get_model(model_name: str, quantized: bool = False):
     """
     Load a question answering model for the specified model name.
+    With `quantized=True`, load the int8 artifact saved next to the checkpoint.
+    """
+    if quantized:
+        return load_quantized_model(model_name)
+    return AutoModelForQuestionAnswering.from_pretrained(model_name)
+
+def tokenizer_fingerprint(tokenizer):
+    """
+    Hash of a tokenizer's full definition (vocab, normalizer, special tokens), so
+    checkpoints fine-tuned from one base model share it while their paths differ.
+    """
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        definition = backend.to_str()
+    else:
+        definition = json.dumps([sorted(tokenizer.get_vocab().items()), tokenizer.special_tokens_map,
+                                 getattr(tokenizer, "do_lower_case", None)], sort_keys=True)
+    return hashlib.sha256(definition.encode("utf-8")).hexdigest()
+
+# === Quantization Utilities ===
+
+def quantize_model(model):
+    """
+    Apply int8 dynamic quantization to the linear layers of a model for CPU inference.
+    """
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def save_quantized_model(model, model_dir: str):
+    """
+    Save the state dict of a quantized model next to the fp32 checkpoint it came from.
+    """
+    path = os.path.join(model_dir, QUANTIZED_WEIGHTS_NAME)
+    torch.save(model.state_dict(), path)
+    return path
+
+def load_quantized_model(model_dir: str):
+    """
+    Rebuild the quantized architecture from the checkpoint config and load the int8 weights.
+    """
+    config = AutoConfig.from_pretrained(model_dir)
+    model = quantize_model(AutoModelForQuestionAnswering.from_config(config))
+    state_dict = torch.load(os.path.join(model_dir, QUANTIZED_WEIGHTS_NAME), map_location="cpu", weights_only=True)
+    model.load_state_dict(state_dict)
+    return model
+
+def has_quantized_model(model_dir: str) -> bool:
+    """
+    Check whether an int8 artifact has been saved for a checkpoint.
+    """
+    return os.path.exists(os.path.join(model_dir, QUANTIZED_WEIGHTS_NAME))
+
+# === Feature Building ===
+
+def build_features(pairs, tokenizer, max_length, doc_stride, max_question_length=None):
+    """
+    Build model input windows for (context, question) pairs.
+
+    Each distinct context and question is tokenized once, and windows are assembled as
+    [CLS] question [SEP] context-window [SEP] with `doc_stride` tokens of overlap, matching
+    `truncation="only_second"` overflow. Questions are kept whole, as in training, unless
+    `max_question_length` caps them. Returns (features, errors), where errors maps the
+    index of each pair that could not be encoded to its exception.
+    """
+    contexts = list(dict.fromkeys(context for context, _ in pairs))
+    questions = list(dict.fromkeys(question for _, question in pairs))
+    encoded_contexts = tokenizer(contexts, add_special_tokens=False, return_offsets_mapping=True)
+    encoded_questions = tokenizer(questions, add_special_tokens=False)
+    context_tokens = {
+        context: (ids, offsets)
+        for context, ids, offsets in zip(contexts, encoded_contexts["input_ids"], encoded_contexts["offset_mapping"])
+    }
+    question_tokens = {
+        question: ids[:max_question_length]
+        for question, ids in zip(questions, encoded_questions["input_ids"])
+    }
+
+    features = []
+    errors = {}
+    for sample_idx, (context, question) in enumerate(pairs):
+        try:
+            if not context.strip():
+                raise ValueError("Context is empty")
+            if not question.strip():
+                raise ValueError("Question is empty")
+            features.extend(_windows(sample_idx, context_tokens[context], question_tokens[question],
+                                     tokenizer, max_length, doc_stride))
+        except Exception as e:
+            errors[sample_idx] = e
+    return features, errors
+
+def _windows(sample_idx, context_tokens, question_ids, tokenizer, max_length, doc_stride):
+    """
+    Split one tokenized context into overlapping windows paired with the question.
+    """
+    context_ids, context_offsets = context_tokens
+    budget = max_length - len(question_ids) - 3  # [CLS], [SEP], [SEP]
+    if budget <= 0:
+        raise ValueError("Question is too long for max_length")
+    step = max(1, budget - doc_stride)
+    prefix = [tokenizer.cls_token_id] + question_ids + [tokenizer.sep_token_id]
+
+    windows = []
+    window_start = 0
+    while True:
+        window_ids = context_ids[window_start:window_start + budget]
+        input_ids = prefix + window_ids + [tokenizer.sep_token_id]
+        context_mask = [False] * len(prefix) + [True] * len(window_ids) + [False]
+        offsets = [(0, 0)] * len(prefix) + context_offsets[window_start:window_start + budget] + [(0, 0)]
+        windows.append({
+            "sample_idx": sample_idx,
+            "input_ids": input_ids,
+            "token_type_ids": [0] * len(prefix) + [1] * (len(window_ids) + 1),
+            "context_mask": context_mask,
+            "offsets": offsets,
+        })
+        if window_start + budget >= len(context_ids):
+            return windows
+        window_start += step
+
+def pad_features(features, pad_token_id):
     """
-    return AutoModelForQuestionAnswering.from_pretrained(model_name)
\ No newline at end of file
+    Pad a list of features to the longest one and stack them into model input tensors,
+    plus the padded context mask used for span decoding.
+    """
+    width = max(len(f["input_ids"]) for f in features)
+    input_ids = torch.full((len(features), width), pad_token_id, dtype=torch.long)
+    token_type_ids = torch.zeros((len(features), width), dtype=torch.long)
+    attention_mask = torch.zeros((len(features), width), dtype=torch.long)
+    context_mask = torch.zeros((len(features), width), dtype=torch.bool)
+    for i, f in enumerate(features):
+        n = len(f["input_ids"])
+        input_ids[i, :n] = torch.tensor(f["input_ids"])
+        token_type_ids[i, :n] = torch.tensor(f["token_type_ids"])
+        attention_mask[i, :n] = 1
+        context_mask[i, :n] = torch.tensor(f["context_mask"])
+    return {
+        "input_ids": input_ids,
+        "token_type_ids": token_type_ids,
+        "attention_mask": attention_mask,
+        "context_mask": context_mask,
+    }
+
+# === Span Decoding ===
+
+def decode_spans(start_logits, end_logits, context_mask, max_answer_length=MAX_ANSWER_LENGTH, top_k=1):
+    """
+    Pick the best answer spans for a whole batch of windows with tensor operations.
+
+    Spans are scored like the HF question-answering pipeline: start and end logits are
+    softmaxed over context tokens only, and a span scores p(start) * p(end) if it lies
+    inside the context, ends at or after its start, and is at most `max_answer_length`
+    tokens long. Returns (scores, starts, ends), each of shape (batch, k) and sorted by
+    score; k is `top_k` capped at the number of valid spans in the batch's widest row.
+    Rows with fewer than k valid spans are padded with entries scored -1.
+    """
+    with torch.inference_mode():
+        context_mask = context_mask.bool()
+        start_probs = torch.softmax(start_logits.float().masked_fill(~context_mask, -10000.0), dim=-1)
+        end_probs = torch.softmax(end_logits.float().masked_fill(~context_mask, -10000.0), dim=-1)
+
+        seq_len = start_logits.shape[-1]
+        positions = torch.arange(seq_len)
+        span_length = positions[None, :] - positions[:, None]
+        in_band = (span_length >= 0) & (span_length < max_answer_length)
+        valid = in_band[None] & context_mask[:, :, None] & context_mask[:, None, :]
+
+        # Invalid spans get -1 so they never outrank a valid span (valid scores are >= 0)
+        scores = (start_probs[:, :, None] * end_probs[:, None, :]).masked_fill(~valid, -1.0)
+        k = max(1, min(top_k, int(valid.flatten(1).sum(dim=1).max())))
+        top_scores, flat_idx = scores.flatten(1).topk(k, dim=1)
+        starts = torch.div(flat_idx, seq_len, rounding_mode="floor")
+        ends = flat_idx % seq_len
+
+    return top_scores, starts, ends
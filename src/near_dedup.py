@@ -0,0 +1,158 @@
+# src/near_dedup.py
+
+# === Imports ===
+import hashlib
+import zlib
+import numpy as np
+from src.eval_utils import normalize_answer
+
+# === Configuration ===
+NUM_PERM = 64
+NUM_BANDS = 16  # 4 rows per band: pairs above ~0.5 Jaccard almost always share a bucket
+THRESHOLD = 0.7
+SEED = 42
+_PRIME = (1 << 31) - 1  # Keeps a * x + b below 2**63 for 32-bit shingle hashes
+
+# === Shingling ===
+
+# Interrogatives, auxiliaries and filler that paraphrases add or swap without changing
+# what is asked ("What medication was prescribed?" / "Which medication was the patient prescribed?")
+QUESTION_STOPWORDS = frozenset("""
+    what which who whom whose when where why how is are was were be been being do does did
+    has have had of for in on at to by with from this that these there patient patients
+    please list name describe tell me according note report
+""".split())
+
+def question_shingles(question):
+    """
+    Shingle set of a question: its normalized content words. A question made only of
+    stop words keeps all of its words, so it is never matched by an empty set.
+    """
+    words = normalize_answer(question).split()
+    content = frozenset(word for word in words if word not in QUESTION_STOPWORDS)
+    return content or frozenset(words)
+
+def answer_key(answer):
+    """
+    Normalized answer span; only questions with the same answer are compared.
+    """
+    return normalize_answer(answer)
+
+def jaccard(a, b):
+    """
+    Jaccard similarity of two sets (1.0 for two empty sets).
+    """
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+def context_key(context):
+    """
+    Short stable key for a context; near-duplicates are only searched within one context.
+    """
+    return hashlib.sha1(context.encode("utf-8")).hexdigest()[:16]
+
+# === MinHash ===
+
+class MinHasher:
+    """
+    MinHash signatures from `num_perm` universal hash functions over 32-bit shingle hashes.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, seed=SEED):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, _PRIME, size=(num_perm, 1), dtype=np.int64)
+        self.b = rng.integers(0, _PRIME, size=(num_perm, 1), dtype=np.int64)
+
+    def signature(self, shingles):
+        """
+        Signature of a shingle set as an int64 array of length `num_perm`.
+        """
+        if not shingles:
+            return np.full(self.num_perm, _PRIME, dtype=np.int64)
+        # crc32 is stable across processes, unlike the salted built-in hash()
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.int64, count=len(shingles))
+        return ((self.a * hashes + self.b) % _PRIME).min(axis=1)
+
+# === Clustering ===
+
+class UnionFind:
+    """
+    Disjoint sets over 0..n-1 with path halving; roots are the smallest index of a set, so
+    the earliest record of each cluster is the one kept.
+    """
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        parent = self.parent
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, x, y):
+        rx, ry = self.find(x), self.find(y)
+        if rx != ry:
+            self.parent[max(rx, ry)] = min(rx, ry)
+
+class NearDuplicateIndex:
+    """
+    Streaming LSH index. Items are added one at a time with a group key (their context and answer);
+    the signature is split into `num_bands` bands, and items of the same group sharing a
+    band bucket are candidates. Candidates are confirmed with the exact Jaccard similarity
+    of their shingle sets, so the threshold is exact and the work stays linear in the
+    number of items, never pairwise across the corpus.
+    """
+
+    def __init__(self, threshold=THRESHOLD, num_perm=NUM_PERM, num_bands=NUM_BANDS, seed=SEED):
+        if num_perm % num_bands:
+            raise ValueError("num_perm must be a multiple of num_bands")
+        self.threshold = threshold
+        self.num_bands = num_bands
+        self.rows = num_perm // num_bands
+        self.hasher = MinHasher(num_perm, seed)
+        self.buckets = {}
+        self.shingles = []
+        self.clusters = UnionFind()
+        self.candidate_pairs = 0
+
+    def add(self, group, shingles):
+        """
+        Index one item and link it to earlier near-duplicates in its group. Returns its index.
+        """
+        idx = len(self.shingles)
+        self.shingles.append(shingles)
+        signature = self.hasher.signature(shingles)
+        seen = set()
+        for band in range(self.num_bands):
+            # Bucket keys are only compared in this process, so the built-in hash() is fine here
+            key = hash((group, band, signature[band * self.rows:(band + 1) * self.rows].tobytes()))
+            bucket = self.buckets.setdefault(key, [])
+            for other in bucket:
+                if other in seen:
+                    continue
+                seen.add(other)
+                self.candidate_pairs += 1
+                if jaccard(shingles, self.shingles[other]) >= self.threshold:
+                    self.clusters.union(idx, other)
+            bucket.append(idx)
+        return idx
+
+    def duplicate_clusters(self):
+        """
+        Clusters with more than one member, as sorted index lists (first one is kept).
+        """
+        members = {}
+        for idx in list(self.clusters.parent):
+            members.setdefault(self.clusters.find(idx), []).append(idx)
+        return [sorted(group) for group in members.values() if len(group) > 1]
+
+    def removed(self):
+        """
+        Indices of items dropped as near-duplicates of an earlier item.
+        """
+        return {idx for cluster in self.duplicate_clusters() for idx in cluster[1:]}
@@ -0,0 +1,331 @@
+# src/qa_generation.py
+
+# === Imports ===
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+from src.jsonl_io import JsonlWriter
+from src.span_validation import format_stats, iter_validated
+
+# === Configuration ===
+MAX_TOKENS = 512
+TEMPERATURE = 0.3
+MAX_RETRIES = 5
+BACKOFF_BASE_S = 1.0
+BACKOFF_MAX_S = 60.0
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+DONE_SUFFIX = ".done"
+
+# === Helpers ===
+
+def text_hash(text):
+    """
+    SHA-256 of a note's text; identifies the note in the cache and the checkpoint.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def is_retryable(error):
+    """
+    Rate limits, overload, server errors and dropped connections are worth retrying;
+    bad requests and auth failures are not.
+    """
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError)) or type(error).__name__ in (
+        "APIConnectionError", "APITimeoutError"
+    )
+
+def parse_qa_pairs(text):
+    """
+    Parse the model's JSON list of {question, answer_text, answer_start} objects.
+    Raises ValueError unless every item is an object with string question and answer_text.
+    """
+    qa_pairs = json.loads(text)
+    if not isinstance(qa_pairs, list):
+        raise ValueError("expected a JSON list of QA pairs")
+    for i, qa in enumerate(qa_pairs):
+        if not isinstance(qa, dict) or not all(isinstance(qa.get(field), str) for field in ("question", "answer_text")):
+            raise ValueError(f"QA pair {i} is not an object with string question and answer_text")
+    return qa_pairs
+
+# === Rate Limiting ===
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second refill up to `capacity`, and each request
+    takes one, so bursts are allowed but the long-run rate never exceeds `rate`.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """
+        Wait until a token is available and take it.
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+# === Response Cache ===
+
+class ResponseCache:
+    """
+    On-disk cache of raw model responses keyed by (model, prompt, note hash), so reruns
+    and prompt-unchanged regenerations never pay for the same call twice.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+
+    def key(self, model, system_prompt, note_text):
+        payload = json.dumps([model, system_prompt, text_hash(note_text), MAX_TOKENS, TEMPERATURE])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """
+        Cached response text, or None. An unreadable entry (e.g. truncated by a crash or a
+        full disk) is deleted and treated as a miss.
+        """
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = json.load(f)["text"]
+            if not isinstance(text, str):
+                raise TypeError("cached text is not a string")
+            return text
+        except (OSError, ValueError, KeyError, TypeError):
+            self.delete(key)
+            return None
+
+    def delete(self, key):
+        self._path(key).unlink(missing_ok=True)
+
+    def put(self, key, text):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"text": text}, f)
+        os.replace(tmp_path, path)
+
+# === Checkpointing ===
+
+def done_path(output_path):
+    """
+    Checkpoint file listing the hashes of notes whose QA pairs are already in the output.
+    Each line is "<note hash> <output size in bytes after its records>"; lines starting
+    with "-" mark the output size when a run started.
+    """
+    return Path(str(output_path) + DONE_SUFFIX)
+
+def _read_checkpoint(output_path):
+    """
+    (note hashes, output size at the last checkpoint or None) from the `.done` file.
+    A partial last line left by a crash is ignored.
+    """
+    path = done_path(output_path)
+    if not path.exists():
+        return set(), None
+    done, size = set(), None
+    with open(path) as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            parts = line.split()
+            if not parts:
+                continue
+            if parts[0] != "-":
+                done.add(parts[0])
+            if len(parts) == 2 and parts[1].isdigit():
+                size = int(parts[1])
+    return done, size
+
+def load_done(output_path):
+    """
+    Hashes of notes completed by earlier runs.
+    """
+    return _read_checkpoint(output_path)[0]
+
+def restore_checkpoint(output_path):
+    """
+    Roll the output and `.done` file back to the last checkpoint. Records written after it
+    belong to a note that was never checkpointed and will be generated again, so keeping
+    them would duplicate that note's records. Returns the completed note hashes.
+    """
+    done, size = _read_checkpoint(output_path)
+    path = done_path(output_path)
+    if path.exists():
+        with open(path, "rb") as f:
+            data = f.read()
+        if data and not data.endswith(b"\n"):
+            with open(path, "r+b") as f:
+                f.truncate(data.rfind(b"\n") + 1)
+    output_path = Path(output_path)
+    if size is not None and output_path.exists() and output_path.stat().st_size > size:
+        with open(output_path, "r+b") as f:
+            f.truncate(size)
+        print(f"Dropped records written after the last checkpoint in {output_path}")
+    return done
+
+# === Stub Client ===
+
+class StubClient:
+    """
+    Local stand-in for `anthropic.AsyncAnthropic` with the same `messages.create` call.
+    It answers after `latency_s` with QA pairs copied verbatim from the note, and fails
+    a `failure_rate` share of calls with a 429, for benchmarks and dry runs.
+    """
+
+    def __init__(self, latency_s=0.5, failure_rate=0.0, seed=0):
+        self.latency_s = latency_s
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self.messages = SimpleNamespace(create=self._create)
+
+    async def _create(self, model, max_tokens, temperature, system, messages):
+        self.calls += 1
+        await asyncio.sleep(self.latency_s)
+        if self._rng.random() < self.failure_rate:
+            raise StubRateLimitError()
+        note = messages[-1]["content"]
+        qa_pairs = []
+        for match in list(re.finditer(r"[A-Za-z][^.\n]{10,80}", note))[:3]:
+            qa_pairs.append({
+                "question": f"What does the note say about {match.group(0).split()[0].lower()}?",
+                "answer_text": match.group(0),
+                "answer_start": match.start(),
+            })
+        return SimpleNamespace(content=[SimpleNamespace(text=json.dumps(qa_pairs))])
+
+class StubRateLimitError(Exception):
+    """
+    429 raised by `StubClient`.
+    """
+    status_code = 429
+
+# === Engine ===
+
+async def _call_with_retries(client, bucket, model, system_prompt, note_text, max_retries, stats):
+    """
+    Send one note to the model, backing off exponentially (with jitter) on retryable errors.
+    """
+    for attempt in range(max_retries + 1):
+        if bucket is not None:
+            await bucket.acquire()
+        try:
+            stats["api_calls"] += 1
+            response = await client.messages.create(
+                model=model,
+                max_tokens=MAX_TOKENS,
+                temperature=TEMPERATURE,
+                system=system_prompt,
+                messages=[{"role": "user", "content": note_text}],
+            )
+            return response.content[0].text
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            stats["retries"] += 1
+            delay = min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** attempt)
+            await asyncio.sleep(delay * (0.5 + random.random() / 2))
+
+async def generate_dataset(notes, client, output_path, note_text, make_records, model, system_prompt,
+                           concurrency=8, requests_per_minute=None, cache_dir=None, max_retries=MAX_RETRIES):
+    """
+    Generate QA records for a stream of notes with up to `concurrency` requests in flight.
+
+    `note_text(note)` gives the text sent to the model and `make_records(note, text,
+    qa_pairs)` the records written for it. Notes listed in the output's `.done` checkpoint
+    are skipped, and each finished note is checkpointed right after its records are
+    flushed, so a crashed run resumes without paying for completed notes. Records flushed
+    after the last checkpoint are dropped on resume rather than duplicated. Responses are
+    cached under `cache_dir`; unreadable or malformed cached responses count as misses. Answer spans are validated before writing: wrong offsets are
+    repaired and answers that are not in the note are dropped. Returns counters for the run.
+    """
+    done = restore_checkpoint(output_path)
+    cache = ResponseCache(cache_dir) if cache_dir else None
+    bucket = TokenBucket(requests_per_minute / 60) if requests_per_minute else None
+    stats = {"notes": 0, "skipped": 0, "cached": 0, "failed": 0, "records": 0, "api_calls": 0, "retries": 0}
+    span_stats = Counter()
+    note_iter = iter(notes)
+
+    with JsonlWriter(output_path, mode="a") as writer, open(done_path(output_path), "a") as done_file:
+        done_file.write(f"- {os.path.getsize(output_path)}\n")
+        done_file.flush()
+
+        async def worker():
+            # Workers pull from one shared iterator, so only `concurrency` notes are in memory
+            for note in note_iter:
+                text = note_text(note)
+                note_id = text_hash(text)
+                if note_id in done:
+                    stats["skipped"] += 1
+                    continue
+                done.add(note_id)  # Claim it so a duplicate note isn't generated twice
+
+                try:
+                    qa_pairs = None
+                    key = cache.key(model, system_prompt, text) if cache else None
+                    cached_text = cache.get(key) if cache else None
+                    if cached_text is not None:
+                        try:
+                            qa_pairs = parse_qa_pairs(cached_text)
+                            stats["cached"] += 1
+                        except ValueError:
+                            cache.delete(key)  # Bad entry: ask the API again
+                    if qa_pairs is None:
+                        response_text = await _call_with_retries(
+                            client, bucket, model, system_prompt, text, max_retries, stats
+                        )
+                        qa_pairs = parse_qa_pairs(response_text)
+                        if cache:
+                            cache.put(key, response_text)
+                    # Built here so a malformed reply fails this note, not the whole run
+                    note_stats = Counter()
+                    records = list(iter_validated(make_records(note, text, qa_pairs), note_stats))
+                except Exception as e:
+                    stats["failed"] += 1
+                    done.discard(note_id)
+                    print(f"Generation failed for note {note_id[:12]}: {e}")
+                    continue
+
+                span_stats.update(note_stats)
+                writer.write_many(records)
+                writer.flush()
+                # The size lets a resume drop records of a note whose checkpoint never landed
+                done_file.write(f"{note_id} {os.path.getsize(output_path)}\n")
+                done_file.flush()
+                stats["notes"] += 1
+                stats["records"] += len(records)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        stats["elapsed_s"] = time.perf_counter() - t0
+    stats["spans"] = dict(span_stats)
+    print(f"Span validation: {format_stats(span_stats)}")
+    return stats
@@ -0,0 +1,174 @@
+# src/span_validation.py
+
+# === Imports ===
+import multiprocessing
+import os
+import re
+from collections import Counter
+from itertools import groupby
+from src.jsonl_io import JsonlWriter, iter_jsonl
+
+# pyahocorasick finds every answer of a context in one pass; without it each answer is
+# located with repeated str.find, which is also linear per answer and runs in C
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# === Configuration ===
+# Bumped whenever repairs change, so fingerprinted preprocessing caches are rebuilt
+SPAN_VALIDATION_VERSION = 2
+GROUPS_PER_TASK = 64  # Contexts sent to a worker at a time
+STATUSES = ("valid", "fixed_offset", "fixed_fuzzy", "skipped")
+
+# === Matching ===
+
+def find_occurrences(context, answers):
+    """
+    Start offsets of every exact occurrence of each answer in `context`, built once per
+    context and shared by all of its questions.
+    """
+    answers = {answer for answer in answers if answer}
+    occurrences = {answer: [] for answer in answers}
+    if ahocorasick is not None and answers:
+        automaton = ahocorasick.Automaton()
+        for answer in answers:
+            automaton.add_word(answer, answer)
+        automaton.make_automaton()
+        for end, answer in automaton.iter(context):
+            occurrences[answer].append(end - len(answer) + 1)
+        return occurrences
+    for answer in answers:
+        start = context.find(answer)
+        while start != -1:
+            occurrences[answer].append(start)
+            start = context.find(answer, start + 1)
+    return occurrences
+
+def fuzzy_matches(context, answer):
+    """
+    (start, end) of every case-insensitive match of `answer` allowing any run of
+    whitespace between its words.
+    """
+    words = answer.split()
+    if not words:
+        return []
+    pattern = re.compile(r"\s+".join(re.escape(word) for word in words), re.IGNORECASE)
+    return [(m.start(), m.end()) for m in pattern.finditer(context)]
+
+def nearest(candidates, claimed_start, key=lambda c: c):
+    """
+    Candidate whose start is closest to the claimed offset (earlier one on ties).
+    """
+    claimed = claimed_start if isinstance(claimed_start, int) and not isinstance(claimed_start, bool) else 0
+    return min(candidates, key=lambda c: (abs(key(c) - claimed), key(c)))
+
+# === Validation ===
+
+def validate_context_records(context, records):
+    """
+    Check and repair the answer spans of records sharing one context. Returns a list of
+    (record, status) where record is None for skipped ones. A wrong offset is moved to the
+    occurrence nearest the claimed one; an answer that only matches up to case and
+    whitespace is replaced by the verbatim text from the context.
+    """
+    occurrences = find_occurrences(context, [r.get("answer_text") for r in records if isinstance(r.get("answer_text"), str)])
+    results = []
+    for record in records:
+        answer = record.get("answer_text")
+        start = record.get("answer_start")
+        if not isinstance(answer, str) or not answer.strip():
+            results.append((None, "skipped"))
+            continue
+        in_range = isinstance(start, int) and not isinstance(start, bool) and 0 <= start <= len(context) - len(answer)
+        if in_range and context[start:start + len(answer)] == answer:
+            results.append((record, "valid"))
+            continue
+        if occurrences.get(answer):
+            results.append(({**record, "answer_start": nearest(occurrences[answer], start)}, "fixed_offset"))
+            continue
+        matches = fuzzy_matches(context, answer)
+        if matches:
+            match_start, match_end = nearest(matches, start, key=lambda m: m[0])
+            repaired = {**record, "answer_text": context[match_start:match_end], "answer_start": match_start}
+            results.append((repaired, "fixed_fuzzy"))
+            continue
+        results.append((None, "skipped"))
+    return results
+
+def _validate_groups(groups):
+    """
+    Validate a list of (context, records) groups; used directly and by pool workers.
+    """
+    return [validate_context_records(context, records) for context, records in groups]
+
+def iter_context_groups(records):
+    """
+    Group consecutive records sharing a context, as generated output is laid out.
+    """
+    for context, group in groupby(records, key=lambda r: r.get("context")):
+        yield context, list(group)
+
+def iter_validated(records, stats=None):
+    """
+    Yield records with repaired spans, dropping ones whose answer is not in the context.
+    `stats`, if given, is a Counter updated with one count per status.
+    """
+    for context, group in iter_context_groups(records):
+        if not isinstance(context, str):
+            if stats is not None:
+                stats["skipped"] += len(group)
+            continue
+        for record, status in validate_context_records(context, group):
+            if stats is not None:
+                stats[status] += 1
+            if record is not None:
+                yield record
+
+def format_stats(stats):
+    """
+    One-line summary of validation counters.
+    """
+    return ", ".join(f"{status}={stats.get(status, 0)}" for status in STATUSES)
+
+def _chunked_groups(records):
+    """
+    Batch context groups into pool tasks.
+    """
+    chunk = []
+    for context, group in iter_context_groups(records):
+        chunk.append((context if isinstance(context, str) else "", group))
+        if len(chunk) == GROUPS_PER_TASK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def validate_file(input_path, output_path, num_proc=None):
+    """
+    Validate and repair every span in a JSONL file, writing kept records in input order.
+    Contexts are spread over `num_proc` processes. Returns the status counters.
+    """
+    num_proc = max(1, num_proc or os.cpu_count() or 1)
+    stats = Counter()
+    with JsonlWriter(output_path) as writer:
+        tasks = _chunked_groups(iter_jsonl(input_path))
+        if num_proc == 1:
+            results = map(_validate_groups, tasks)
+            pool = None
+        else:
+            pool = multiprocessing.get_context("spawn").Pool(num_proc)
+            results = pool.imap(_validate_groups, tasks)  # Ordered, so the output keeps input order
+        try:
+            for chunk_results in results:
+                for group_results in chunk_results:
+                    for record, status in group_results:
+                        stats[status] += 1
+                        if record is not None:
+                            writer.write(record)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+    print(f"Span validation for {input_path}: {format_stats(stats)}. Saved to {output_path}")
+    return stats